@@ -0,0 +1,67 @@
+"""
+Compare the speed of our JSON backends on our familysleep chart responses.
+
+Run from the root of the repository:
+
+    python -m tests.benchmark.benchmark_renderers
+
+Any of orjson, ujson, or python-rapidjson that are installed are compared against the stdlib
+and against simplejson with use_decimal, which is how cornice serializes by default.
+"""
+
+import json
+import simplejson
+import timeit
+import tractdb_pyramid.renderers
+
+# Our reference responses, the weekly charts are the largest
+PAYLOADS = [
+    'tests/full/familysleep/test_familysleepview_singledaily_reference.json',
+    'tests/full/familysleep/test_familysleepview_singleweekly_reference.json',
+    'tests/full/familysleep/test_familysleepview_familyweekly_reference.json',
+]
+
+# Each measurement is the best of these repeats
+REPEAT = 5
+
+
+def _cornice_dumps(value):
+    return simplejson.dumps(value, use_decimal=True)
+
+
+def _benchmark(dumps, value, number):
+    # Seconds per call, the best of our repeats
+    return min(timeit.repeat(lambda: dumps(value), repeat=REPEAT, number=number)) / number
+
+
+def main():
+    candidates = [('simplejson (cornice)', _cornice_dumps)]
+    candidates.extend(tractdb_pyramid.renderers.BACKENDS.items())
+
+    print('Selected backend: {}'.format(tractdb_pyramid.renderers.BACKEND))
+
+    for path in PAYLOADS:
+        with open(path, 'r', encoding='utf-8') as f:
+            value = json.load(f)
+
+        # Enough calls that each repeat takes a measurable time
+        size = len(_cornice_dumps(value))
+        number = max(10, 10000000 // size)
+
+        print()
+        print('{} ({:,} bytes, {} calls)'.format(path, size, number))
+
+        baseline = None
+        for name, dumps in candidates:
+            # Every backend must produce the same JSON
+            assert json.loads(dumps(value)) == value, name
+
+            seconds = _benchmark(dumps, value, number)
+            if baseline is None:
+                baseline = seconds
+
+            print('  {:<22} {:>10.1f} us  {:>5.1f}x'.format(name, seconds * 1000000, baseline / seconds))
+
+
+if __name__ == '__main__':
+    main()
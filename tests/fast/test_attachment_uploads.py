@@ -0,0 +1,42 @@
+import io
+import nose.tools
+import pyramid.testing
+import tractdb_pyramid.views.attachmentview
+
+
+class TestAttachmentUploads:
+    def _request(self, body, max_size, content_length=True):
+        request = pyramid.testing.DummyRequest()
+        request.registry.tractdb_attachment_max_size = max_size
+        request.content_length = len(body) if content_length else None
+        request.body_file = io.BytesIO(body)
+
+        return request
+
+    def test_upload_body(self):
+        # An upload within our maximum is read in chunks
+        request = self._request(b'x' * 100, max_size=100)
+        body = tractdb_pyramid.views.attachmentview._get_upload_body(request)
+        nose.tools.assert_equal(body.read(64), b'x' * 64)
+        nose.tools.assert_equal(body.read(64), b'x' * 36)
+        nose.tools.assert_equal(body.read(64), b'')
+
+        # Without a maximum, any upload is read
+        request = self._request(b'x' * 100, max_size=0)
+        body = tractdb_pyramid.views.attachmentview._get_upload_body(request)
+        nose.tools.assert_equal(body.read(), b'x' * 100)
+
+    def test_upload_too_large(self):
+        # A Content-Length beyond our maximum is rejected before reading
+        request = self._request(b'x' * 101, max_size=100)
+        nose.tools.assert_is_none(tractdb_pyramid.views.attachmentview._get_upload_body(request))
+
+        # Without a Content-Length, it is rejected once too much has been read
+        request = self._request(b'x' * 101, max_size=100, content_length=False)
+        body = tractdb_pyramid.views.attachmentview._get_upload_body(request)
+        body.read(64)
+        nose.tools.assert_raises(
+            tractdb_pyramid.views.attachmentview._UploadTooLarge,
+            body.read,
+            64
+        )
@@ -0,0 +1,221 @@
+import couchdb.http
+import io
+import nose.tools
+import socket
+import time
+import tractdb_pyramid.connections
+
+
+class _Connection:
+    def __init__(self):
+        self.closed = False
+        self.sock = None
+
+    def close(self):
+        self.closed = True
+
+
+class _FailingBody:
+    def read(self, size=-1):
+        raise ValueError('Upload abandoned.')
+
+
+class _RejectingSession:
+    """ Stands in for a session, rejecting document requests with a status until we log in again.
+    """
+
+    def __init__(self, status):
+        self.status = status
+        self.requests = []
+
+    def request(self, method, url, body=None, headers=None, credentials=None, num_redirects=0):
+        self.requests.append((method, url))
+
+        if url.endswith('/_session'):
+            return 200, {
+                'content-type': 'application/json',
+                'set-cookie': 'AuthSession=bmV3; Version=1; Path=/; HttpOnly'
+            }, io.BytesIO(b'{"ok": true}')
+
+        if headers['Cookie'] == 'AuthSession=bmV3':
+            return 200, {}, io.BytesIO(b'')
+
+        if self.status == 401:
+            raise couchdb.http.Unauthorized(('unauthorized', 'Name or password is incorrect.'))
+        raise couchdb.http.ServerError((self.status, ('forbidden', 'Invalid document.')))
+
+
+class TestConnections:
+    def test_pool_size(self):
+        pool = tractdb_pyramid.connections.ConnectionPool(size=2, timeout=None)
+        url = 'http://localhost:5984/alice_tractdb'
+
+        # Released connections are kept until the pool is full
+        conns = [_Connection() for _ in range(3)]
+        for conn in conns:
+            pool.release(url, conn)
+
+        nose.tools.assert_equal(pool.stats()['idle'], 2)
+        nose.tools.assert_false(conns[0].closed)
+        nose.tools.assert_false(conns[1].closed)
+        nose.tools.assert_true(conns[2].closed)
+
+        # Kept connections are reused
+        nose.tools.assert_is(pool.get(url), conns[1])
+        nose.tools.assert_equal(pool.stats()['reused'], 1)
+
+    def test_server_credentials(self):
+        connections = tractdb_pyramid.connections.CouchDBConnections(
+            couchdb_url='http://localhost:5984',
+            pool_size=2
+        )
+
+        # Each server authenticates as its own user, over the same session
+        server_alice = connections.server('alice', 'p@ss:word')
+        server_bob = connections.server('bob', 'password')
+
+        nose.tools.assert_equal(server_alice.resource.credentials, ('alice', 'p@ss:word'))
+        nose.tools.assert_equal(server_bob.resource.credentials, ('bob', 'password'))
+        nose.tools.assert_is(server_alice.resource.session, server_bob.resource.session)
+
+    def test_cookie_authentication(self):
+        authentication = tractdb_pyramid.connections.CookieAuthentication(
+            couchdb_url='http://localhost:5984',
+            user='alice',
+            password='password',
+            timeout=600
+        )
+
+        # Without a cookie, one is needed
+        nose.tools.assert_true(authentication.expired)
+
+        # A cookie from CouchDB is kept
+        authentication.update({'set-cookie': 'AuthSession=YWxpY2U6NTk; Version=1; Path=/; HttpOnly'})
+        nose.tools.assert_equal(authentication.cookie, 'YWxpY2U6NTk')
+        nose.tools.assert_false(authentication.expired)
+
+        # Responses without a cookie do not change it
+        authentication.update({})
+        nose.tools.assert_equal(authentication.cookie, 'YWxpY2U6NTk')
+
+        # A cookie near its timeout is expired
+        authentication.obtained = time.time() - 590
+        nose.tools.assert_true(authentication.expired)
+
+    def test_cookie_rejected(self):
+        def resource(session):
+            authentication = tractdb_pyramid.connections.CookieAuthentication(
+                couchdb_url='http://localhost:5984',
+                user='alice',
+                password='password',
+                timeout=600,
+                cookie='b2xk',
+                obtained=time.time()
+            )
+
+            return tractdb_pyramid.connections._CookieResource(
+                'http://localhost:5984/alice_tractdb',
+                session,
+                authentication=authentication
+            )
+
+        # An expired cookie is refreshed, and the request retried
+        session = _RejectingSession(401)
+        resource(session).put('doc')
+        nose.tools.assert_equal(len(session.requests), 3)
+
+        # A forbidden write is not
+        session = _RejectingSession(403)
+        nose.tools.assert_raises(couchdb.http.ServerError, resource(session).put, 'doc')
+        nose.tools.assert_equal(len(session.requests), 1)
+
+    def test_circuit_breaker(self):
+        breaker = tractdb_pyramid.connections.CircuitBreaker(
+            threshold=0.5,
+            window=4,
+            minimum=4,
+            reset_timeout=0.05
+        )
+
+        # Failures below the minimum do not open the breaker
+        for _ in range(3):
+            breaker.record(False)
+        nose.tools.assert_true(breaker.allow())
+
+        # Reaching the threshold opens it
+        breaker.record(True)
+        nose.tools.assert_equal(breaker.stats()['state'], 'open')
+        nose.tools.assert_false(breaker.allow())
+
+        # After the reset timeout, a single trial is allowed
+        time.sleep(0.1)
+        nose.tools.assert_true(breaker.allow())
+        nose.tools.assert_false(breaker.allow())
+
+        # A failed trial keeps it open, a successful trial closes it
+        breaker.record(False)
+        nose.tools.assert_false(breaker.allow())
+        time.sleep(0.1)
+        nose.tools.assert_true(breaker.allow())
+        breaker.record(True)
+        nose.tools.assert_equal(breaker.stats()['state'], 'closed')
+        nose.tools.assert_true(breaker.allow())
+
+    def test_circuit_breaker_abandoned_trial(self):
+        breaker = tractdb_pyramid.connections.CircuitBreaker(
+            threshold=0.5,
+            window=1,
+            minimum=1,
+            reset_timeout=0.05
+        )
+        session = tractdb_pyramid.connections._ResilientSession(
+            retries=0,
+            retry_delay=0,
+            circuit_breaker=breaker
+        )
+
+        # Somewhere that accepts our connection, so the request fails while sending its body
+        listener = socket.socket()
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(1)
+        url = 'http://127.0.0.1:{}/alice_tractdb/doc/attachment'.format(listener.getsockname()[1])
+
+        try:
+            # Open the breaker, and wait for a trial
+            breaker.record(False)
+            time.sleep(0.1)
+
+            # A trial that fails for reasons other than CouchDB does not keep the breaker open
+            nose.tools.assert_raises(ValueError, session.request, 'PUT', url, body=_FailingBody())
+            nose.tools.assert_true(breaker.allow())
+        finally:
+            listener.close()
+
+    def test_circuit_breaker_retries(self):
+        breaker = tractdb_pyramid.connections.CircuitBreaker(
+            threshold=0.5,
+            window=20,
+            minimum=10,
+            reset_timeout=30
+        )
+        session = tractdb_pyramid.connections._ResilientSession(
+            retries=2,
+            retry_delay=0,
+            circuit_breaker=breaker
+        )
+
+        # Somewhere that refuses our connection
+        listener = socket.socket()
+        listener.bind(('127.0.0.1', 0))
+        url = 'http://127.0.0.1:{}/alice_tractdb/doc'.format(listener.getsockname()[1])
+        listener.close()
+
+        # A read that fails after its retries is a single failure
+        nose.tools.assert_raises(
+            tractdb_pyramid.connections.CouchDBUnavailable,
+            session.request,
+            'GET',
+            url
+        )
+        nose.tools.assert_equal(breaker.stats()['requests'], 1)
+        nose.tools.assert_equal(breaker.stats()['failures'], 1)
@@ -0,0 +1,60 @@
+import nose.tools
+import time
+import tractdb_pyramid.cache
+
+
+class TestDocumentCache:
+    def test_get_put(self):
+        cache = tractdb_pyramid.cache.DocumentCache(size=10, ttl=60)
+
+        # Nothing is cached at first
+        nose.tools.assert_is_none(cache.get('account', 'doc'))
+
+        # A stored document is fresh
+        cache.put('account', 'doc', {'_id': 'doc', '_rev': '1-a'})
+        doc, fresh = cache.get('account', 'doc')
+        nose.tools.assert_equal(doc, {'_id': 'doc', '_rev': '1-a'})
+        nose.tools.assert_true(fresh)
+
+        # Documents are keyed by account
+        nose.tools.assert_is_none(cache.get('other', 'doc'))
+
+        # Modifying what we got does not modify what is cached
+        doc['field'] = 'value'
+        nose.tools.assert_equal(cache.get('account', 'doc')[0], {'_id': 'doc', '_rev': '1-a'})
+
+        # An invalidated document is gone
+        cache.invalidate('account', 'doc')
+        nose.tools.assert_is_none(cache.get('account', 'doc'))
+
+    def test_evicts_least_recently_used(self):
+        cache = tractdb_pyramid.cache.DocumentCache(size=2, ttl=60)
+
+        cache.put('account', 'doc_0', {'_id': 'doc_0'})
+        cache.put('account', 'doc_1', {'_id': 'doc_1'})
+
+        # Use the first, so the second is least recently used
+        cache.get('account', 'doc_0')
+        cache.put('account', 'doc_2', {'_id': 'doc_2'})
+
+        nose.tools.assert_is_not_none(cache.get('account', 'doc_0'))
+        nose.tools.assert_is_none(cache.get('account', 'doc_1'))
+        nose.tools.assert_is_not_none(cache.get('account', 'doc_2'))
+        nose.tools.assert_equal(cache.stats()['evictions'], 1)
+
+    def test_ttl_revalidation(self):
+        cache = tractdb_pyramid.cache.DocumentCache(size=10, ttl=0.01)
+
+        # Once the ttl passes, a document is no longer fresh
+        cache.put('account', 'doc', {'_id': 'doc', '_rev': '1-a'})
+        time.sleep(0.02)
+        nose.tools.assert_false(cache.get('account', 'doc')[1])
+
+        # Until it is revalidated
+        cache.revalidated('account', 'doc')
+        cache.record_revalidation()
+        nose.tools.assert_true(cache.get('account', 'doc')[1])
+
+        stats = cache.stats()
+        nose.tools.assert_equal(stats['hits'], 1)
+        nose.tools.assert_equal(stats['revalidations'], 1)
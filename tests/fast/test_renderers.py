@@ -0,0 +1,44 @@
+import decimal
+import json
+import nose.tools
+import tractdb_pyramid.renderers
+
+
+class TestRenderers:
+    def test_dumps(self):
+        value = {
+            'labels': ['06:30 PM', '06:31 PM'],
+            'values': [0, 1, 2, 3],
+            'name': 'café / sleep',
+            'missing': None
+        }
+
+        # Whichever backend we use, the result is the same JSON
+        nose.tools.assert_equal(
+            json.loads(tractdb_pyramid.renderers.dumps(value)),
+            value
+        )
+
+    def test_dumps_default(self):
+        # Anything the backend cannot encode is converted by default
+        nose.tools.assert_equal(
+            json.loads(tractdb_pyramid.renderers.dumps(
+                {'value': decimal.Decimal('1.5')},
+                default=float,
+                use_decimal=True
+            )),
+            {'value': 1.5}
+        )
+
+    def test_dumps_stdlib(self):
+        # The stdlib is always available
+        nose.tools.assert_in('json', tractdb_pyramid.renderers.BACKENDS)
+        nose.tools.assert_in(tractdb_pyramid.renderers.BACKEND, tractdb_pyramid.renderers.BACKENDS)
+
+    def test_render_decimal(self):
+        # As with the simplejson renderer of cornice, a Decimal is a number
+        renderer = tractdb_pyramid.renderers.json_renderer_factory()(None)
+        nose.tools.assert_equal(
+            json.loads(renderer({'value': decimal.Decimal('1.25')}, {})),
+            {'value': 1.25}
+        )
@@ -0,0 +1,109 @@
+import couchdb
+import nose.tools
+import tractdb_pyramid.documents
+
+
+class _Admin:
+    """ Stands in for a DocumentsAdmin, counting the reads that would go to CouchDB.
+    """
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.reads = 0
+
+    def exists_document(self, doc_id):
+        self.reads += 1
+        return doc_id in self.docs
+
+    def get_document_if_exists(self, doc_id):
+        self.reads += 1
+        return dict(self.docs[doc_id]) if doc_id in self.docs else None
+
+    def update_documents(self, docs):
+        results = []
+        for doc in docs:
+            if doc.get('_deleted', False):
+                self.docs.pop(doc['_id'], None)
+            results.append({'id': doc['_id'], 'rev': '2-b'})
+        return results
+
+    def update_document(self, doc, doc_id=None, doc_rev=None):
+        doc_id = doc_id if doc_id is not None else doc['_id']
+        doc_rev = '2-b'
+        self.docs[doc_id] = dict(doc, _id=doc_id, _rev=doc_rev)
+        return {'id': doc_id, 'rev': doc_rev}
+
+
+class TestRequestDocumentsAdmin:
+    def test_repeated_reads(self):
+        admin = _Admin({'personas': {'_id': 'personas', '_rev': '1-a', 'personas': {}}})
+        request_admin = tractdb_pyramid.documents.RequestDocumentsAdmin(admin)
+
+        # A document is read once
+        request_admin.get_document('personas')
+        request_admin.get_document('personas')
+        nose.tools.assert_equal(admin.reads, 1)
+
+        # Its existence is known from that read
+        nose.tools.assert_true(request_admin.exists_document('personas'))
+        nose.tools.assert_equal(admin.reads, 1)
+
+        # A missing document is checked once
+        nose.tools.assert_false(request_admin.exists_document('missing'))
+        nose.tools.assert_false(request_admin.exists_document('missing'))
+        nose.tools.assert_equal(admin.reads, 2)
+
+    def test_copies(self):
+        admin = _Admin({'personas': {'_id': 'personas', '_rev': '1-a', 'personas': {}}})
+        request_admin = tractdb_pyramid.documents.RequestDocumentsAdmin(admin)
+
+        # Modifying a document we were given does not modify what is remembered
+        doc = request_admin.get_document('personas')
+        doc['personas']['p1'] = {}
+        nose.tools.assert_equal(request_admin.get_document('personas')['personas'], {})
+
+    def test_writes(self):
+        admin = _Admin({'personas': {'_id': 'personas', '_rev': '1-a', 'personas': {}}})
+        request_admin = tractdb_pyramid.documents.RequestDocumentsAdmin(admin)
+
+        # A written document is remembered with its new revision
+        doc = request_admin.get_document('personas')
+        doc['personas']['p1'] = {}
+        request_admin.update_document(doc)
+
+        doc = request_admin.get_document('personas')
+        nose.tools.assert_equal(doc['_rev'], '2-b')
+        nose.tools.assert_equal(doc['personas'], {'p1': {}})
+        nose.tools.assert_equal(admin.reads, 1)
+
+    def test_bulk_deletes(self):
+        admin = _Admin({'personas': {'_id': 'personas', '_rev': '1-a', 'personas': {}}})
+        request_admin = tractdb_pyramid.documents.RequestDocumentsAdmin(admin)
+
+        # A document deleted in a bulk write is remembered as not existing
+        request_admin.get_document('personas')
+        request_admin.update_documents([{'_id': 'personas', '_rev': '1-a', '_deleted': True}])
+
+        nose.tools.assert_false(request_admin.exists_document('personas'))
+        nose.tools.assert_is_none(request_admin.get_document_if_exists('personas'))
+        nose.tools.assert_is_none(request_admin.get_document_revision('personas'))
+        nose.tools.assert_equal(admin.reads, 1)
+
+
+class TestDocumentResource:
+    def test_reserved_ids(self):
+        database = couchdb.Database('http://localhost:5984/alice_tractdb')
+
+        # The / of a design or local document is kept, other ids are escaped
+        nose.tools.assert_equal(
+            tractdb_pyramid.documents._document_resource(database, '_design/tractdb').url,
+            'http://localhost:5984/alice_tractdb/_design/tractdb'
+        )
+        nose.tools.assert_equal(
+            tractdb_pyramid.documents._document_resource(database, '_local/checkpoint').url,
+            'http://localhost:5984/alice_tractdb/_local/checkpoint'
+        )
+        nose.tools.assert_equal(
+            tractdb_pyramid.documents._document_resource(database, 'run/1').url,
+            'http://localhost:5984/alice_tractdb/run%2F1'
+        )
@@ -0,0 +1,74 @@
+import gzip
+import nose.tools
+import pyramid.request
+import pyramid.response
+import pyramid.testing
+import tractdb_pyramid.tweens
+
+
+class TestCompressionTween:
+    def setup(self):
+        self.config = pyramid.testing.setUp(settings={
+            'tractdb.compression.minimum_size': '100',
+            'tractdb.compression.level': '6'
+        })
+
+    def teardown(self):
+        pyramid.testing.tearDown()
+
+    def _tween(self, response):
+        return tractdb_pyramid.tweens.compression_tween_factory(
+            lambda request: response,
+            self.config.registry
+        )
+
+    def test_compresses_when_accepted(self):
+        body = b'{"labels": ["06:30 PM", "06:31 PM"]}' * 10
+        tween = self._tween(pyramid.response.Response(body=body, content_type='application/json'))
+
+        response = tween(pyramid.request.Request.blank('/', headers={'Accept-Encoding': 'gzip'}))
+
+        nose.tools.assert_equal(response.content_encoding, 'gzip')
+        nose.tools.assert_in('Accept-Encoding', response.vary)
+        nose.tools.assert_equal(gzip.decompress(response.body), body)
+
+    def test_does_not_compress_when_not_accepted(self):
+        body = b'{"labels": ["06:30 PM", "06:31 PM"]}' * 10
+        tween = self._tween(pyramid.response.Response(body=body, content_type='application/json'))
+
+        response = tween(pyramid.request.Request.blank('/'))
+
+        nose.tools.assert_is_none(response.content_encoding)
+        nose.tools.assert_in('Accept-Encoding', response.vary)
+        nose.tools.assert_equal(response.body, body)
+
+    def test_does_not_compress_small_or_binary(self):
+        tween = self._tween(pyramid.response.Response(body=b'{}', content_type='application/json'))
+        response = tween(pyramid.request.Request.blank('/', headers={'Accept-Encoding': 'gzip'}))
+        nose.tools.assert_is_none(response.content_encoding)
+
+        tween = self._tween(pyramid.response.Response(body=b'\x89PNG' * 100, content_type='image/png'))
+        response = tween(pyramid.request.Request.blank('/', headers={'Accept-Encoding': 'gzip'}))
+        nose.tools.assert_is_none(response.content_encoding)
+
+    def test_compresses_streamed(self):
+        chunks = [b'{"documents": [', b'{"_id": "a"}', b']}']
+        tween = self._tween(pyramid.response.Response(app_iter=iter(chunks), content_type='application/json'))
+
+        response = tween(pyramid.request.Request.blank('/', headers={'Accept-Encoding': 'gzip'}))
+
+        nose.tools.assert_equal(response.content_encoding, 'gzip')
+        nose.tools.assert_equal(gzip.decompress(b''.join(response.app_iter)), b''.join(chunks))
+
+    def test_does_not_compress_ranges_or_validators(self):
+        body = b'{"labels": ["06:30 PM", "06:31 PM"]}' * 10
+
+        response = pyramid.response.Response(body=body, content_type='application/json')
+        response.etag = 'md5-0ZIVsdcUdX4f2wBgxS/UyA=='
+        response = self._tween(response)(pyramid.request.Request.blank('/', headers={'Accept-Encoding': 'gzip'}))
+        nose.tools.assert_is_none(response.content_encoding)
+
+        response = pyramid.response.Response(body=body, content_type='application/json')
+        response.accept_ranges = 'bytes'
+        response = self._tween(response)(pyramid.request.Request.blank('/', headers={'Accept-Encoding': 'gzip'}))
+        nose.tools.assert_is_none(response.content_encoding)
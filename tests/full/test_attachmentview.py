@@ -209,3 +209,245 @@ class TestAttachmentView:
             cls.utilities.test_attachment_name(),
             response.json()['attachments']
         )
+
+    def test_get_large_attachment(self):
+        cls = type(self)
+        session = cls.session
+
+        # Larger than a single chunk, so it is streamed
+        attachment_bytes = bytes(range(256)) * 4096
+
+        # Create an attachment
+        response = session.post(
+            '{}/{}/{}/{}/{}'.format(
+                cls.utilities.url_base_pyramid(),
+                'document',
+                cls.utilities.test_document_id(),
+                'attachment',
+                cls.utilities.test_attachment_name()
+            ),
+            headers={
+                'Content-Type': 'application/octet-stream'
+            },
+            data=attachment_bytes
+        )
+        nose.tools.assert_equal(response.status_code, 201)
+
+        # Get the attachment
+        response = session.get(
+            '{}/{}/{}/{}/{}'.format(
+                cls.utilities.url_base_pyramid(),
+                'document',
+                cls.utilities.test_document_id(),
+                'attachment',
+                cls.utilities.test_attachment_name()
+            )
+        )
+        nose.tools.assert_equal(response.status_code, 200)
+
+        # Confirm the length and content match
+        nose.tools.assert_equal(
+            response.headers['Content-Length'],
+            str(len(attachment_bytes))
+        )
+        nose.tools.assert_equal(
+            response.content,
+            attachment_bytes
+        )
+
+    def test_get_attachment_range(self):
+        cls = type(self)
+        session = cls.session
+
+        attachment_bytes = bytes(range(256)) * 16
+
+        # Create an attachment
+        response = session.post(
+            '{}/{}/{}/{}/{}'.format(
+                cls.utilities.url_base_pyramid(),
+                'document',
+                cls.utilities.test_document_id(),
+                'attachment',
+                cls.utilities.test_attachment_name()
+            ),
+            headers={
+                'Content-Type': 'application/octet-stream'
+            },
+            data=attachment_bytes
+        )
+        nose.tools.assert_equal(response.status_code, 201)
+
+        url_attachment = '{}/{}/{}/{}/{}'.format(
+            cls.utilities.url_base_pyramid(),
+            'document',
+            cls.utilities.test_document_id(),
+            'attachment',
+            cls.utilities.test_attachment_name()
+        )
+
+        # Get the start of the attachment
+        response = session.get(
+            url_attachment,
+            headers={
+                'Range': 'bytes=0-99'
+            }
+        )
+        nose.tools.assert_equal(response.status_code, 206)
+        nose.tools.assert_equal(
+            response.headers['Content-Range'],
+            'bytes 0-99/{}'.format(len(attachment_bytes))
+        )
+        nose.tools.assert_equal(response.content, attachment_bytes[0:100])
+
+        # Get the middle of the attachment
+        response = session.get(
+            url_attachment,
+            headers={
+                'Range': 'bytes=1000-1999'
+            }
+        )
+        nose.tools.assert_equal(response.status_code, 206)
+        nose.tools.assert_equal(response.content, attachment_bytes[1000:2000])
+
+        # A range beyond the attachment cannot be satisfied
+        response = session.get(
+            url_attachment,
+            headers={
+                'Range': 'bytes={}-'.format(len(attachment_bytes) + 100)
+            }
+        )
+        nose.tools.assert_equal(response.status_code, 416)
+
+        # A range for another version of the attachment gets all of it
+        response = session.get(
+            url_attachment,
+            headers={
+                'Range': 'bytes=0-99',
+                'If-Range': '"md5-other"'
+            }
+        )
+        nose.tools.assert_equal(response.status_code, 200)
+        nose.tools.assert_equal(response.content, attachment_bytes)
+
+    def test_get_attachment_not_modified(self):
+        cls = type(self)
+        session = cls.session
+
+        url_attachment = '{}/{}/{}/{}/{}'.format(
+            cls.utilities.url_base_pyramid(),
+            'document',
+            cls.utilities.test_document_id(),
+            'attachment',
+            cls.utilities.test_attachment_name()
+        )
+
+        # Create an attachment
+        response = session.post(
+            url_attachment,
+            headers={
+                'Content-Type': 'application/octet-stream'
+            },
+            data=bytes(range(256))
+        )
+        nose.tools.assert_equal(response.status_code, 201)
+
+        # Get the attachment, which has an ETag
+        response = session.get(url_attachment)
+        nose.tools.assert_equal(response.status_code, 200)
+        nose.tools.assert_in('ETag', response.headers)
+        etag = response.headers['ETag']
+
+        # The same version is not sent again
+        response = session.get(
+            url_attachment,
+            headers={
+                'If-None-Match': etag
+            }
+        )
+        nose.tools.assert_equal(response.status_code, 304)
+        nose.tools.assert_equal(response.headers['ETag'], etag)
+        nose.tools.assert_equal(response.content, b'')
+
+        # Modify the attachment
+        response = session.put(
+            url_attachment,
+            headers={
+                'Content-Type': 'application/octet-stream'
+            },
+            data=bytes(reversed(range(256)))
+        )
+        nose.tools.assert_equal(response.status_code, 200)
+
+        # A new version is sent
+        response = session.get(
+            url_attachment,
+            headers={
+                'If-None-Match': etag
+            }
+        )
+        nose.tools.assert_equal(response.status_code, 200)
+        nose.tools.assert_not_equal(response.headers['ETag'], etag)
+        nose.tools.assert_equal(response.content, bytes(reversed(range(256))))
+
+    def test_attachment_conflicts_and_missing(self):
+        cls = type(self)
+        session = cls.session
+
+        url_attachment = '{}/{}/{}/{}/{}'.format(
+            cls.utilities.url_base_pyramid(),
+            'document',
+            cls.utilities.test_document_id(),
+            'attachment',
+            cls.utilities.test_attachment_name()
+        )
+
+        # Deleting an attachment that does not exist fails
+        response = session.delete(url_attachment)
+        nose.tools.assert_equal(response.status_code, 404)
+
+        # Create an attachment
+        response = session.post(
+            url_attachment,
+            headers={
+                'Content-Type': 'application/octet-stream'
+            },
+            data=bytes(range(256))
+        )
+        nose.tools.assert_equal(response.status_code, 201)
+
+        # Creating it again fails
+        response = session.post(
+            url_attachment,
+            headers={
+                'Content-Type': 'application/octet-stream'
+            },
+            data=bytes(range(256))
+        )
+        nose.tools.assert_equal(response.status_code, 409)
+
+        # Listing the attachments of a document that does not exist fails
+        response = session.get(
+            '{}/{}/{}/{}'.format(
+                cls.utilities.url_base_pyramid(),
+                'document',
+                'missing_document',
+                'attachments'
+            )
+        )
+        nose.tools.assert_equal(response.status_code, 404)
+
+        # Creating an attachment on a document that does not exist fails
+        response = session.post(
+            '{}/{}/{}/{}/{}'.format(
+                cls.utilities.url_base_pyramid(),
+                'document',
+                'missing_document',
+                'attachment',
+                cls.utilities.test_attachment_name()
+            ),
+            headers={
+                'Content-Type': 'application/octet-stream'
+            },
+            data=bytes(range(256))
+        )
+        nose.tools.assert_equal(response.status_code, 404)
@@ -0,0 +1,116 @@
+import nose.tools
+import requests
+import tests.utilities
+
+
+class TestChangesView:
+    @classmethod
+    def setup_class(cls):
+        cls.utilities = tests.utilities.Utilities('TestChangesView')
+
+        # Ensure we have a test account
+        cls.utilities.ensure_fresh_account(
+            cls.utilities.test_account_name(),
+            cls.utilities.test_account_password()
+        )
+
+        # Create a session for the account
+        cls.session = cls.utilities.session_pyramid(
+            cls.utilities.test_account_name(),
+            cls.utilities.test_account_password()
+        )
+
+    @classmethod
+    def teardown_class(cls):
+        # Clean up our account
+        cls.utilities.delete_account(
+            cls.utilities.test_account_name()
+        )
+
+    def setup(self):
+        cls = type(self)
+
+        # Ensure no documents remain from prior tests
+        cls.utilities.delete_all_documents(cls.session)
+
+    def teardown(self):
+        cls = type(self)
+
+        # Clean up our documents
+        cls.utilities.delete_all_documents(cls.session)
+
+    def test_get_changes_since(self):
+        cls = type(self)
+        session = cls.session
+
+        # Get the current sequence
+        response = session.get(
+            '{}/{}'.format(
+                cls.utilities.url_base_pyramid(),
+                'changes'
+            )
+        )
+        nose.tools.assert_equal(response.status_code, 200)
+        last_seq = response.json()['last_seq']
+
+        # Create a document
+        response = session.put(
+            '{}/{}/{}'.format(
+                cls.utilities.url_base_pyramid(),
+                'document',
+                cls.utilities.test_document_id()
+            ),
+            json=cls.utilities.test_document()
+        )
+        nose.tools.assert_equal(response.status_code, 201)
+
+        # Only that document has changed since
+        response = session.get(
+            '{}/{}'.format(
+                cls.utilities.url_base_pyramid(),
+                'changes'
+            ),
+            params={
+                'since': last_seq,
+                'feed': 'longpoll',
+                'timeout': 1000
+            }
+        )
+        nose.tools.assert_equal(response.status_code, 200)
+        nose.tools.assert_equal(
+            [result['id'] for result in response.json()['results']],
+            [cls.utilities.test_document_id()]
+        )
+
+    def test_get_changes_requires_authentication(self):
+        cls = type(self)
+
+        # A session that has not logged in
+        response = requests.get(
+            '{}/{}'.format(
+                cls.utilities.url_base_pyramid(),
+                'changes'
+            )
+        )
+        nose.tools.assert_equal(response.status_code, 403)
+
+    def test_get_changes_bad_parameters(self):
+        cls = type(self)
+        session = cls.session
+
+        # Negative and malformed parameters are bad requests
+        for params in [
+            {'since': '-1'},
+            {'limit': '-1'},
+            {'limit': 'many'},
+            {'timeout': '-1'},
+            {'feed': 'continuous'}
+        ]:
+            response = session.get(
+                '{}/{}'.format(
+                    cls.utilities.url_base_pyramid(),
+                    'changes'
+                ),
+                params=params
+            )
+            nose.tools.assert_equal(response.status_code, 400)
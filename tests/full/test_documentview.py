@@ -353,3 +353,548 @@ class TestDocumentView:
         docs.remove(cls.utilities.test_document())
         docs.remove(cls.utilities.test_document(1))
         nose.tools.assert_equal(len(docs), 0)
+
+    def test_get_documents_paged(self):
+        cls = type(self)
+        session = cls.session
+
+        # Create three documents
+        for document_index in range(3):
+            response = session.post(
+                '{}/{}'.format(
+                    cls.utilities.url_base_pyramid(),
+                    'documents'
+                ),
+                json={
+                    'id': cls.utilities.test_document_id(document_index),
+                    'document': cls.utilities.test_document(document_index)
+                }
+            )
+            nose.tools.assert_equal(response.status_code, 201)
+
+        # Get the first page
+        response = session.get(
+            '{}/{}'.format(
+                cls.utilities.url_base_pyramid(),
+                'documents'
+            ),
+            params={
+                'limit': 2
+            }
+        )
+        nose.tools.assert_equal(response.status_code, 200)
+        page = response.json()
+        nose.tools.assert_equal(
+            [doc['_id'] for doc in page['documents']],
+            [cls.utilities.test_document_id(0), cls.utilities.test_document_id(1)]
+        )
+        nose.tools.assert_equal(page['next'], cls.utilities.test_document_id(2))
+
+        # Get the second page, which is the last
+        response = session.get(
+            '{}/{}'.format(
+                cls.utilities.url_base_pyramid(),
+                'documents'
+            ),
+            params={
+                'limit': 2,
+                'startkey': page['next']
+            }
+        )
+        nose.tools.assert_equal(response.status_code, 200)
+        page = response.json()
+        nose.tools.assert_equal(
+            [doc['_id'] for doc in page['documents']],
+            [cls.utilities.test_document_id(2)]
+        )
+        nose.tools.assert_is_none(page['next'])
+
+        # An invalid limit is rejected
+        response = session.get(
+            '{}/{}'.format(
+                cls.utilities.url_base_pyramid(),
+                'documents'
+            ),
+            params={
+                'limit': 0
+            }
+        )
+        nose.tools.assert_equal(response.status_code, 400)
+
+    def test_get_documents_streamed(self):
+        cls = type(self)
+        session = cls.session
+
+        # Create two documents
+        for document_index in range(2):
+            response = session.post(
+                '{}/{}'.format(
+                    cls.utilities.url_base_pyramid(),
+                    'documents'
+                ),
+                json={
+                    'document': cls.utilities.test_document(document_index)
+                }
+            )
+            nose.tools.assert_equal(response.status_code, 201)
+
+        # Get them all at once
+        response = session.get(
+            '{}/{}'.format(
+                cls.utilities.url_base_pyramid(),
+                'documents'
+            )
+        )
+        nose.tools.assert_equal(response.status_code, 200)
+        docs = response.json()['documents']
+
+        # Get them streamed
+        response = session.get(
+            '{}/{}'.format(
+                cls.utilities.url_base_pyramid(),
+                'documents'
+            ),
+            params={
+                'stream': 'true'
+            }
+        )
+        nose.tools.assert_equal(response.status_code, 200)
+
+        # Confirm they are the same
+        nose.tools.assert_equal(docs, response.json()['documents'])
+
+    def test_bulk_create_modify_documents(self):
+        cls = type(self)
+        session = cls.session
+
+        # Create two documents, one with a particular ID
+        response = session.post(
+            '{}/{}'.format(
+                cls.utilities.url_base_pyramid(),
+                'documents/_bulk'
+            ),
+            json={
+                'documents': [
+                    dict(cls.utilities.test_document(0), _id=cls.utilities.test_document_id(0)),
+                    cls.utilities.test_document(1)
+                ]
+            }
+        )
+        nose.tools.assert_equal(response.status_code, 200)
+        results = response.json()['documents']
+        nose.tools.assert_equal(len(results), 2)
+        nose.tools.assert_equal(results[0]['_id'], cls.utilities.test_document_id(0))
+        nose.tools.assert_in('_rev', results[0])
+        nose.tools.assert_in('_rev', results[1])
+
+        # Modify the first with its revision, and try to modify the second without one
+        response = session.post(
+            '{}/{}'.format(
+                cls.utilities.url_base_pyramid(),
+                'documents/_bulk'
+            ),
+            json={
+                'documents': [
+                    dict(cls.utilities.test_document(2), _id=results[0]['_id'], _rev=results[0]['_rev']),
+                    dict(cls.utilities.test_document(2), _id=results[1]['_id'])
+                ]
+            }
+        )
+        nose.tools.assert_equal(response.status_code, 200)
+        results_modified = response.json()['documents']
+        nose.tools.assert_in('_rev', results_modified[0])
+        nose.tools.assert_equal(results_modified[1]['error'], 'conflict')
+
+        # Confirm the first was modified
+        response = session.get(
+            '{}/{}/{}'.format(
+                cls.utilities.url_base_pyramid(),
+                'document',
+                results[0]['_id']
+            )
+        )
+        nose.tools.assert_equal(response.status_code, 200)
+        cls.utilities.assert_docs_equal_ignoring_id_rev(
+            response.json(),
+            cls.utilities.test_document(2)
+        )
+
+    def test_bulk_create_bad_documents(self):
+        cls = type(self)
+        session = cls.session
+
+        # A request with any document CouchDB would reject is a bad request
+        for documents in [
+            [cls.utilities.test_document(0), 'not a document'],
+            [cls.utilities.test_document(0), dict(cls.utilities.test_document(1), _id='_reserved')],
+            [cls.utilities.test_document(0), dict(cls.utilities.test_document(1), _rev=1)],
+            {'not': 'a list'}
+        ]:
+            response = session.post(
+                '{}/{}'.format(
+                    cls.utilities.url_base_pyramid(),
+                    'documents/_bulk'
+                ),
+                json={
+                    'documents': documents
+                }
+            )
+            nose.tools.assert_equal(response.status_code, 400)
+
+        # None of the documents were created
+        response = session.get(
+            '{}/{}'.format(
+                cls.utilities.url_base_pyramid(),
+                'documents'
+            )
+        )
+        nose.tools.assert_equal(response.status_code, 200)
+        nose.tools.assert_equal(response.json()['documents'], [])
+
+    def test_bulk_get_documents(self):
+        cls = type(self)
+        session = cls.session
+
+        # Create two documents
+        for document_index in range(2):
+            response = session.post(
+                '{}/{}'.format(
+                    cls.utilities.url_base_pyramid(),
+                    'documents'
+                ),
+                json={
+                    'id': cls.utilities.test_document_id(document_index),
+                    'document': cls.utilities.test_document(document_index)
+                }
+            )
+            nose.tools.assert_equal(response.status_code, 201)
+
+        # Get them together with an id that does not exist
+        response = session.post(
+            '{}/{}'.format(
+                cls.utilities.url_base_pyramid(),
+                'documents/_bulk_get'
+            ),
+            json={
+                'ids': [
+                    cls.utilities.test_document_id(1),
+                    cls.utilities.test_document_id(2),
+                    cls.utilities.test_document_id(0)
+                ]
+            }
+        )
+        nose.tools.assert_equal(response.status_code, 200)
+        body = response.json()
+
+        # Confirm we got the documents in order and the missing id
+        nose.tools.assert_equal(len(body['documents']), 2)
+        cls.utilities.assert_docs_equal_ignoring_id_rev(
+            body['documents'][0],
+            cls.utilities.test_document(1)
+        )
+        cls.utilities.assert_docs_equal_ignoring_id_rev(
+            body['documents'][1],
+            cls.utilities.test_document(0)
+        )
+        nose.tools.assert_equal(body['missing'], [cls.utilities.test_document_id(2)])
+
+    def test_get_document_conditional(self):
+        cls = type(self)
+        session = cls.session
+
+        # Create a document
+        response = session.put(
+            '{}/{}/{}'.format(
+                cls.utilities.url_base_pyramid(),
+                'document',
+                cls.utilities.test_document_id()
+            ),
+            json=cls.utilities.test_document()
+        )
+        nose.tools.assert_equal(response.status_code, 201)
+        doc_rev = response.json()['_rev']
+
+        # Get the document, its revision is the ETag
+        response = session.get(
+            '{}/{}/{}'.format(
+                cls.utilities.url_base_pyramid(),
+                'document',
+                cls.utilities.test_document_id()
+            )
+        )
+        nose.tools.assert_equal(response.status_code, 200)
+        nose.tools.assert_equal(response.headers['ETag'], '"{}"'.format(doc_rev))
+
+        # Get it again with that ETag, it is not modified
+        response = session.get(
+            '{}/{}/{}'.format(
+                cls.utilities.url_base_pyramid(),
+                'document',
+                cls.utilities.test_document_id()
+            ),
+            headers={
+                'If-None-Match': '"{}"'.format(doc_rev)
+            }
+        )
+        nose.tools.assert_equal(response.status_code, 304)
+        nose.tools.assert_equal(response.content, b'')
+
+        # Modify the document
+        response = session.put(
+            '{}/{}/{}'.format(
+                cls.utilities.url_base_pyramid(),
+                'document',
+                cls.utilities.test_document_id()
+            ),
+            json=dict(cls.utilities.test_document(1), _rev=doc_rev)
+        )
+        nose.tools.assert_equal(response.status_code, 200)
+
+        # Get it again with the old ETag, it is modified
+        response = session.get(
+            '{}/{}/{}'.format(
+                cls.utilities.url_base_pyramid(),
+                'document',
+                cls.utilities.test_document_id()
+            ),
+            headers={
+                'If-None-Match': '"{}"'.format(doc_rev)
+            }
+        )
+        nose.tools.assert_equal(response.status_code, 200)
+        cls.utilities.assert_docs_equal_ignoring_id_rev(
+            response.json(),
+            cls.utilities.test_document(1)
+        )
+
+    def test_modify_delete_document_if_match(self):
+        cls = type(self)
+        session = cls.session
+
+        # Create a document
+        response = session.put(
+            '{}/{}/{}'.format(
+                cls.utilities.url_base_pyramid(),
+                'document',
+                cls.utilities.test_document_id()
+            ),
+            json=cls.utilities.test_document()
+        )
+        nose.tools.assert_equal(response.status_code, 201)
+        doc_rev_created = response.json()['_rev']
+
+        # Modify it, providing the revision in a header
+        response = session.put(
+            '{}/{}/{}'.format(
+                cls.utilities.url_base_pyramid(),
+                'document',
+                cls.utilities.test_document_id()
+            ),
+            headers={
+                'If-Match': '"{}"'.format(doc_rev_created)
+            },
+            json=cls.utilities.test_document(1)
+        )
+        nose.tools.assert_equal(response.status_code, 200)
+        doc_rev_modified = response.json()['_rev']
+
+        # Deleting with the old revision is a conflict
+        response = session.delete(
+            '{}/{}/{}'.format(
+                cls.utilities.url_base_pyramid(),
+                'document',
+                cls.utilities.test_document_id()
+            ),
+            headers={
+                'If-Match': '"{}"'.format(doc_rev_created)
+            }
+        )
+        nose.tools.assert_equal(response.status_code, 409)
+
+        # Deleting with the current revision succeeds
+        response = session.delete(
+            '{}/{}/{}'.format(
+                cls.utilities.url_base_pyramid(),
+                'document',
+                cls.utilities.test_document_id()
+            ),
+            headers={
+                'If-Match': '"{}"'.format(doc_rev_modified)
+            }
+        )
+        nose.tools.assert_equal(response.status_code, 200)
+
+        # Deleting again finds nothing
+        response = session.delete(
+            '{}/{}/{}'.format(
+                cls.utilities.url_base_pyramid(),
+                'document',
+                cls.utilities.test_document_id()
+            )
+        )
+        nose.tools.assert_equal(response.status_code, 404)
+
+    def test_modify_delete_document_if_match_any_or_malformed(self):
+        cls = type(self)
+        session = cls.session
+
+        url_document = '{}/{}/{}'.format(
+            cls.utilities.url_base_pyramid(),
+            'document',
+            cls.utilities.test_document_id()
+        )
+
+        # Modifying any revision requires that the document exists
+        response = session.put(
+            url_document,
+            headers={
+                'If-Match': '*'
+            },
+            json=cls.utilities.test_document()
+        )
+        nose.tools.assert_equal(response.status_code, 412)
+
+        # Create a document
+        response = session.put(
+            url_document,
+            json=cls.utilities.test_document()
+        )
+        nose.tools.assert_equal(response.status_code, 201)
+        doc_rev_created = response.json()['_rev']
+
+        # Modify whatever its current revision is
+        response = session.put(
+            url_document,
+            headers={
+                'If-Match': '*'
+            },
+            json=cls.utilities.test_document(1)
+        )
+        nose.tools.assert_equal(response.status_code, 200)
+        doc_rev_modified = response.json()['_rev']
+        nose.tools.assert_not_equal(doc_rev_modified, doc_rev_created)
+
+        # A weak tag or more than one tag cannot name a revision
+        response = session.put(
+            url_document,
+            headers={
+                'If-Match': 'W/"{}"'.format(doc_rev_modified)
+            },
+            json=cls.utilities.test_document()
+        )
+        nose.tools.assert_equal(response.status_code, 412)
+
+        response = session.delete(
+            url_document,
+            headers={
+                'If-Match': '"{}", "{}"'.format(doc_rev_created, doc_rev_modified)
+            }
+        )
+        nose.tools.assert_equal(response.status_code, 412)
+
+        # A malformed revision is a bad request
+        response = session.delete(
+            url_document,
+            headers={
+                'If-Match': '"not-a-revision"'
+            }
+        )
+        nose.tools.assert_equal(response.status_code, 400)
+
+        response = session.delete(
+            url_document,
+            params={
+                'rev': 'not-a-revision'
+            }
+        )
+        nose.tools.assert_equal(response.status_code, 400)
+
+        # Delete whatever its current revision is
+        response = session.delete(
+            url_document,
+            headers={
+                'If-Match': '*'
+            }
+        )
+        nose.tools.assert_equal(response.status_code, 200)
+
+    def test_get_document_fields(self):
+        cls = type(self)
+        session = cls.session
+
+        # Create a document
+        response = session.put(
+            '{}/{}/{}'.format(
+                cls.utilities.url_base_pyramid(),
+                'document',
+                cls.utilities.test_document_id()
+            ),
+            json=cls.utilities.test_document()
+        )
+        nose.tools.assert_equal(response.status_code, 201)
+
+        # Get only one of its fields
+        response = session.get(
+            '{}/{}/{}'.format(
+                cls.utilities.url_base_pyramid(),
+                'document',
+                cls.utilities.test_document_id()
+            ),
+            params={
+                'fields': 'test_field'
+            }
+        )
+        nose.tools.assert_equal(response.status_code, 200)
+        nose.tools.assert_equal(
+            sorted(response.json().keys()),
+            ['_id', '_rev', 'test_field']
+        )
+
+        # Get only that field from the collection
+        response = session.get(
+            '{}/{}'.format(
+                cls.utilities.url_base_pyramid(),
+                'documents'
+            ),
+            params={
+                'fields': 'test_field'
+            }
+        )
+        nose.tools.assert_equal(response.status_code, 200)
+        for doc in response.json()['documents']:
+            nose.tools.assert_equal(
+                sorted(doc.keys()),
+                ['_id', '_rev', 'test_field']
+            )
+
+    def test_get_documents_prefix(self):
+        cls = type(self)
+        session = cls.session
+
+        # Create documents with two different prefixes
+        for doc_id in ['prefix_a_0', 'prefix_a_1', 'prefix_b_0']:
+            response = session.put(
+                '{}/{}/{}'.format(
+                    cls.utilities.url_base_pyramid(),
+                    'document',
+                    doc_id
+                ),
+                json=cls.utilities.test_document()
+            )
+            nose.tools.assert_equal(response.status_code, 201)
+
+        # Get only those with one prefix
+        response = session.get(
+            '{}/{}'.format(
+                cls.utilities.url_base_pyramid(),
+                'documents'
+            ),
+            params={
+                'prefix': 'prefix_a_'
+            }
+        )
+        nose.tools.assert_equal(response.status_code, 200)
+        nose.tools.assert_equal(
+            [doc['_id'] for doc in response.json()['documents']],
+            ['prefix_a_0', 'prefix_a_1']
+        )
@@ -0,0 +1,67 @@
+import couchdb
+import couchdb.http
+import tractdb.server.accounts
+
+
+class AccountsAdmin(tractdb.server.accounts.AccountsAdmin):
+    """ Supports management of TractDB accounts.
+
+    Given tractdb_pyramid.connections.CouchDBConnections, requests use those shared connections.
+    Adds lookups of a single account, which do not list every account. Holds no state that
+    changes, so a single admin object can be shared by concurrent requests.
+    """
+
+    def __init__(self, couchdb_url, couchdb_admin, couchdb_admin_password, connections=None):
+        """ Create an admin object.
+        """
+        super().__init__(
+            couchdb_url=couchdb_url,
+            couchdb_admin=couchdb_admin,
+            couchdb_admin_password=couchdb_admin_password
+        )
+
+        # Our credentials never change, so neither does our server object
+        if connections is not None:
+            self._couchdb_server_shared = connections.server(couchdb_admin, couchdb_admin_password)
+        else:
+            self._couchdb_server_shared = None
+
+    def exists_account(self, account):
+        """ Check whether an account exists.
+        """
+        return self.get_account(account) is not None
+
+    def get_account(self, account):
+        """ Get an account and its roles, reading only its own user document.
+
+        Returns a dict with 'account' and 'roles', or None if the account does not exist.
+        As in list_accounts, an account exists only if both its user and its database exist.
+        """
+        server = self._couchdb_server
+        dbname = '{:s}_tractdb'.format(account)
+
+        # Get the user document, without first checking the users database exists
+        database_users = couchdb.Database(server.resource('_users'), '_users')
+        doc_user = database_users.get('org.couchdb.user:{:s}'.format(account))
+        if doc_user is None:
+            return None
+
+        # Confirm the database exists
+        try:
+            server.resource(dbname).head()
+        except couchdb.http.ResourceNotFound:
+            return None
+
+        return {
+            'account': account,
+            'roles': list(doc_user.get('roles', []))
+        }
+
+    @property
+    def _couchdb_server(self):
+        """ The server, using our shared connections if we have them.
+        """
+        if self._couchdb_server_shared is None:
+            return super()._couchdb_server
+
+        return self._couchdb_server_shared
@@ -0,0 +1,108 @@
+import collections
+import copy
+import threading
+import time
+
+
+class DocumentCache(object):
+    """ A bounded cache of documents, shared by all requests in a process.
+
+    Entries are keyed by account and document id, and the least recently used entry is
+    evicted when the cache is full. An entry younger than the time to live is used as is,
+    an older entry must be revalidated against the current revision before it is used.
+    """
+
+    def __init__(self, size, ttl):
+        """ Create a cache holding at most size documents, each fresh for ttl seconds.
+        """
+        self._size = size
+        self._ttl = ttl
+
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._revalidations = 0
+        self._evictions = 0
+
+    def get(self, account, doc_id):
+        """ Get a cached document.
+
+        Returns a tuple of a copy of the document and whether it is still fresh, or None if
+        the document is not cached. A document that is not fresh must be revalidated.
+        """
+        key = (account, doc_id)
+
+        with self._lock:
+            entry = self._entries.get(key, None)
+            if entry is None:
+                return None
+
+            # Mark it as most recently used
+            self._entries.move_to_end(key)
+
+            timestamp, doc = entry
+            fresh = time.monotonic() - timestamp < self._ttl
+
+        return copy.deepcopy(doc), fresh
+
+    def invalidate(self, account, doc_id):
+        """ Remove a document from the cache.
+        """
+        with self._lock:
+            self._entries.pop((account, doc_id), None)
+
+    def put(self, account, doc_id, doc):
+        """ Store a document, which is then fresh for the time to live.
+        """
+        key = (account, doc_id)
+        doc = copy.deepcopy(doc)
+
+        with self._lock:
+            self._entries[key] = (time.monotonic(), doc)
+            self._entries.move_to_end(key)
+
+            # Evict the least recently used entries
+            while len(self._entries) > self._size:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def record_hit(self):
+        with self._lock:
+            self._hits += 1
+
+    def record_miss(self):
+        with self._lock:
+            self._misses += 1
+
+    def record_revalidation(self):
+        """ Record that a document that was not fresh is still current, which counts as a hit.
+        """
+        with self._lock:
+            self._hits += 1
+            self._revalidations += 1
+
+    def revalidated(self, account, doc_id):
+        """ Mark a cached document as fresh again, after confirming it is still current.
+        """
+        key = (account, doc_id)
+
+        with self._lock:
+            entry = self._entries.get(key, None)
+            if entry is not None:
+                self._entries[key] = (time.monotonic(), entry[1])
+
+    def stats(self):
+        """ Counters for tuning the cache.
+        """
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'max_size': self._size,
+                'ttl': self._ttl,
+                'hits': self._hits,
+                'misses': self._misses,
+                'revalidations': self._revalidations,
+                'evictions': self._evictions
+            }
@@ -0,0 +1,476 @@
+import collections
+import couchdb
+import couchdb.http
+import couchdb.util
+import http.client
+import http.cookies
+import pyramid.httpexceptions
+import random
+import threading
+import time
+import urllib.parse
+
+
+class CouchDBConnections(object):
+    """ Connections to CouchDB, shared by all requests in a process.
+
+    Connections are kept alive and reused across requests and accounts, because
+    credentials are sent with each request rather than bound to a connection.
+
+    Requests time out, reads that fail are retried, and a circuit breaker fails requests
+    fast with CouchDBUnavailable while CouchDB is failing.
+    """
+
+    def __init__(self, couchdb_url, pool_size, connect_timeout=None, read_timeout=None, retries=0, retry_delay=0.1, circuit_breaker=None):
+        """ Create connections to a CouchDB, keeping at most pool_size idle connections.
+
+        Timeouts are in seconds, None waiting indefinitely. GET and HEAD requests that fail are
+        retried up to retries times, after a random delay of up to retry_delay seconds that
+        doubles with each retry. Without a CircuitBreaker, requests are never failed fast.
+        """
+        self._couchdb_url = couchdb_url
+        self._connect_timeout = connect_timeout
+        self._read_timeout = read_timeout
+
+        # A single session, so every server object shares its connection pool
+        self._session = _ResilientSession(
+            retries=retries,
+            retry_delay=retry_delay,
+            circuit_breaker=circuit_breaker
+        )
+        self._session.connection_pool = ConnectionPool(
+            size=pool_size,
+            timeout=connect_timeout,
+            read_timeout=read_timeout
+        )
+
+        # Our admin objects check revisions themselves, so the session does not cache
+        self._session.cache = _NoCache()
+
+    def cookie_server(self, authentication):
+        """ A server object that authenticates with a CookieAuthentication and uses our shared connections.
+        """
+        return couchdb.Server(_CookieResource(self._couchdb_url, self._session, authentication=authentication))
+
+    def server(self, user, password):
+        """ A server object that authenticates as a user and uses our shared connections.
+        """
+        return couchdb.Server(_format_server_url(self._couchdb_url, user, password), session=self._session)
+
+    def stats(self):
+        """ Counters for tuning the pool size, and the state of the circuit breaker.
+        """
+        stats = self._session.connection_pool.stats()
+
+        circuit_breaker = self._session.circuit_breaker
+        if circuit_breaker is not None:
+            stats['circuit_breaker'] = circuit_breaker.stats()
+
+        return stats
+
+    @property
+    def timeout(self):
+        """ Our connect and read timeouts, as a tuple for the requests library.
+        """
+        return self._connect_timeout, self._read_timeout
+
+
+class CircuitBreaker(object):
+    """ Tracks the outcome of recent requests to CouchDB, to stop sending requests while it fails.
+
+    The breaker opens once at least minimum of the last window requests have completed and the
+    fraction that failed reaches threshold. While open, requests are refused. After
+    reset_timeout seconds a single trial request is allowed, which closes the breaker if it
+    succeeds and keeps it open if it fails.
+    """
+
+    def __init__(self, threshold, window, minimum, reset_timeout):
+        """ Create a closed breaker.
+        """
+        self._threshold = threshold
+        self._minimum = minimum
+        self._reset_timeout = reset_timeout
+
+        self._outcomes = collections.deque(maxlen=window)
+        self._opened = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    def allow(self):
+        """ Whether a request may be sent.
+        """
+        with self._lock:
+            if self._opened is None:
+                return True
+
+            # Allow a single trial once we have waited
+            if self._trial or time.monotonic() - self._opened < self._reset_timeout:
+                return False
+
+            self._trial = True
+
+            return True
+
+    def record(self, success):
+        """ Record the outcome of a request.
+        """
+        with self._lock:
+            if self._opened is not None:
+                # Only our trial decides whether to close, other requests were sent before we opened
+                if not self._trial:
+                    return
+
+                self._trial = False
+                if success:
+                    self._opened = None
+                    self._outcomes.clear()
+                else:
+                    self._opened = time.monotonic()
+
+                return
+
+            self._outcomes.append(success)
+
+            failures = self._outcomes.count(False)
+            if len(self._outcomes) >= self._minimum and failures / len(self._outcomes) >= self._threshold:
+                self._opened = time.monotonic()
+                self._outcomes.clear()
+
+    def release(self):
+        """ End a request whose outcome says nothing about CouchDB, such as one we abandoned.
+
+        If it was our trial, another trial is allowed.
+        """
+        with self._lock:
+            self._trial = False
+
+    def stats(self):
+        """ The state of the breaker, and the outcomes it is tracking.
+        """
+        with self._lock:
+            if self._opened is None:
+                state = 'closed'
+            elif self._trial:
+                state = 'half_open'
+            else:
+                state = 'open'
+
+            return {
+                'state': state,
+                'requests': len(self._outcomes),
+                'failures': self._outcomes.count(False)
+            }
+
+
+class CouchDBUnavailable(pyramid.httpexceptions.HTTPServiceUnavailable):
+    """ CouchDB could not be reached, or is failing and our circuit breaker is open.
+
+    As an HTTP exception, a view that raises this responds with a 503.
+    """
+
+
+class CookieAuthentication(object):
+    """ Authentication as a user with a CouchDB session cookie.
+
+    Unlike a password, CouchDB does not hash a cookie on every request. A cookie is refreshed
+    with the password once it is older than timeout seconds, which should match the CouchDB
+    cookie timeout, or if CouchDB rejects it. Each new cookie is given to on_refresh.
+    """
+
+    def __init__(self, couchdb_url, user, password, timeout, cookie=None, obtained=None, on_refresh=None):
+        """ Create an authentication, which obtains a cookie on first use if not given one.
+        """
+        self._couchdb_url = couchdb_url
+        self._user = user
+        self._password = password
+        self._timeout = timeout
+        self._on_refresh = on_refresh
+
+        self.cookie = cookie
+        self.obtained = obtained
+
+    @property
+    def expired(self):
+        """ Whether we need a new cookie, leaving a margin before CouchDB would expire it.
+        """
+        if self.cookie is None or self.obtained is None:
+            return True
+
+        return time.time() - self.obtained > self._timeout * 0.9
+
+    def refresh(self, session):
+        """ Obtain a new cookie by logging in with our password.
+        """
+        resource = couchdb.http.Resource(self._couchdb_url, session)
+        _, headers, _ = resource.post_json(
+            '_session',
+            body={
+                'name': self._user,
+                'password': self._password
+            }
+        )
+
+        self.update(headers)
+
+    def update(self, headers):
+        """ Keep any new cookie in the headers of a CouchDB response.
+
+        CouchDB also sends a new cookie on other responses, before the current one expires.
+        """
+        cookie = _auth_session_cookie(headers)
+        if cookie is None:
+            return
+
+        self.cookie = cookie
+        self.obtained = time.time()
+
+        if self._on_refresh is not None:
+            self._on_refresh(self.cookie, self.obtained)
+
+
+class ConnectionPool(couchdb.http.ConnectionPool):
+    """ A keep-alive connection pool that keeps at most size idle connections per host.
+
+    Connections released while the pool is full are closed.
+    """
+
+    def __init__(self, size, timeout, read_timeout=None, disable_ssl_verification=False):
+        """ Create a pool, whose new connections wait up to timeout seconds to connect and
+        then up to read_timeout seconds for each read.
+        """
+        super().__init__(timeout, disable_ssl_verification=disable_ssl_verification)
+
+        self._size = size
+        self._read_timeout = read_timeout
+        self._opened = 0
+        self._reused = 0
+        self._closed = 0
+
+    def get(self, url):
+        scheme, host = couchdb.util.urlsplit(url, 'http', False)[:2]
+
+        with self.lock:
+            reused = len(self.conns.get((scheme, host), ())) > 0
+            if reused:
+                self._reused += 1
+            else:
+                self._opened += 1
+
+        conn = super().get(url)
+
+        # Connected, so any further waiting is for a read
+        conn.timeout = self._read_timeout
+        if conn.sock is not None:
+            conn.sock.settimeout(self._read_timeout)
+
+        return conn
+
+    def release(self, url, conn):
+        scheme, host = couchdb.util.urlsplit(url, 'http', False)[:2]
+
+        with self.lock:
+            conns = self.conns.setdefault((scheme, host), [])
+            if len(conns) < self._size:
+                conns.append(conn)
+                return
+
+            self._closed += 1
+
+        conn.close()
+
+    def stats(self):
+        """ Counters for tuning the pool size, opened and reused are approximate under concurrency.
+        """
+        with self.lock:
+            return {
+                'pool_size': self._size,
+                'idle': sum(len(conns) for conns in self.conns.values()),
+                'opened': self._opened,
+                'reused': self._reused,
+                'closed': self._closed
+            }
+
+
+class _CookieResource(couchdb.http.Resource):
+    """ A resource that authenticates with a CookieAuthentication.
+
+    A request that CouchDB rejects as unauthenticated with a 401, as when it has expired the
+    cookie, is retried once with a new cookie. A 403 is a refusal of an authenticated user,
+    such as by a validate_doc_update function, so it is not retried.
+    """
+
+    def __init__(self, url, session, headers=None, authentication=None):
+        super().__init__(url, session, headers=headers)
+
+        self._authentication = authentication
+
+    def __call__(self, *path):
+        obj = super().__call__(*path)
+        obj._authentication = self._authentication
+
+        return obj
+
+    def _request(self, method, path=None, body=None, headers=None, **params):
+        authentication = self._authentication
+
+        # Obtain a cookie if we have none or it is about to expire
+        if authentication.expired:
+            authentication.refresh(self.session)
+
+        try:
+            status, response_headers, data = self._request_with_cookie(
+                method, path, body=body, headers=headers, **params
+            )
+        except couchdb.http.Unauthorized:
+            # A body we are streaming cannot be sent again
+            if hasattr(body, 'read'):
+                raise
+
+            authentication.refresh(self.session)
+            status, response_headers, data = self._request_with_cookie(
+                method, path, body=body, headers=headers, **params
+            )
+
+        authentication.update(response_headers)
+
+        return status, response_headers, data
+
+    def _request_with_cookie(self, method, path=None, body=None, headers=None, **params):
+        headers = dict(headers or {})
+        headers['Cookie'] = 'AuthSession={}'.format(self._authentication.cookie)
+
+        return super()._request(method, path, body=body, headers=headers, **params)
+
+
+class _ResilientSession(couchdb.http.Session):
+    """ A session that retries failed reads and respects a circuit breaker.
+
+    A request fails if CouchDB cannot be reached, times out, or responds with a server error.
+    A request that cannot reach CouchDB raises CouchDBUnavailable.
+    """
+
+    def __init__(self, retries, retry_delay, circuit_breaker):
+        super().__init__()
+
+        self.circuit_breaker = circuit_breaker
+        self._retries = retries
+        self._retry_delay = retry_delay
+
+    def request(self, method, url, body=None, headers=None, credentials=None, num_redirects=0):
+        if self.circuit_breaker is not None and not self.circuit_breaker.allow():
+            raise CouchDBUnavailable('CouchDB is failing, requests are paused.')
+
+        # Only reads can be safely sent again
+        attempts = 1 + self._retries if method.upper() in ('GET', 'HEAD') else 1
+
+        for attempt in range(attempts):
+            try:
+                result = super().request(
+                    method,
+                    url,
+                    body=body,
+                    headers=dict(headers or {}),
+                    credentials=credentials,
+                    num_redirects=num_redirects
+                )
+            except (OSError, http.client.HTTPException, couchdb.http.ServerError) as e:
+                # A client error is CouchDB responding as it should
+                if isinstance(e, couchdb.http.ServerError) and e.args[0][0] < 500:
+                    self._record(True)
+                    raise
+
+                if attempt + 1 < attempts:
+                    time.sleep(random.uniform(0, self._retry_delay * 2 ** attempt))
+                    continue
+
+                # A request is a single outcome, however many times we tried it
+                self._record(False)
+
+                if isinstance(e, couchdb.http.ServerError):
+                    raise
+
+                raise CouchDBUnavailable('CouchDB could not be reached.') from e
+            except couchdb.http.HTTPError:
+                self._record(True)
+                raise
+            except BaseException:
+                # Not an outcome of CouchDB, but a trial must not be left unfinished
+                self._release()
+                raise
+
+            self._record(True)
+
+            return result
+
+    def _record(self, success):
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.record(success)
+
+    def _release(self):
+        if self.circuit_breaker is not None:
+            self.circuit_breaker.release()
+
+
+class _NoCache(object):
+    """ A session cache that stores nothing.
+    """
+
+    def get(self, url):
+        return None
+
+    def put(self, url, response):
+        pass
+
+    def remove(self, url):
+        pass
+
+
+def _auth_session_cookie(headers):
+    """ The AuthSession cookie set by a CouchDB response, or None.
+    """
+    set_cookie = headers.get('set-cookie', None)
+    if not set_cookie:
+        return None
+
+    morsel = http.cookies.SimpleCookie(set_cookie).get('AuthSession', None)
+    if morsel is None or not morsel.value:
+        return None
+
+    return morsel.value
+
+
+def cookie_authentication(request):
+    """ Authentication for the account of a request, by the CouchDB cookie from its login.
+
+    A refreshed cookie is kept in the session, for use by later requests.
+    """
+    def on_refresh(cookie, obtained):
+        request.session['couchdb_auth_session'] = {
+            'cookie': cookie,
+            'obtained': obtained
+        }
+
+    auth_session = request.session.get('couchdb_auth_session', None) or {}
+
+    return CookieAuthentication(
+        couchdb_url=request.registry.settings['tractdb_couchdb'],
+        user=request.session['temp_couchdb_user'],
+        password=request.session['temp_couchdb_user_password'],
+        timeout=float(request.registry.settings.get('tractdb.couchdb.cookie_timeout', 600)),
+        cookie=auth_session.get('cookie', None),
+        obtained=auth_session.get('obtained', None),
+        on_refresh=on_refresh
+    )
+
+
+def _format_server_url(couchdb_url, user, password):
+    """ Format the base URL for connecting to the server as a user.
+    """
+    scheme = urllib.parse.urlparse(couchdb_url).scheme
+
+    return '{}://{:s}:{:s}@{:s}'.format(
+        scheme,
+        urllib.parse.quote(user, safe=''),
+        urllib.parse.quote(password, safe=''),
+        couchdb_url[len(scheme) + len('://'):]
+    )
@@ -0,0 +1,680 @@
+import copy
+import couchdb
+import couchdb.http
+import tractdb.server.documents
+import tractdb_pyramid.connections
+
+# Attachments are streamed in chunks of this many bytes
+ATTACHMENT_CHUNK_SIZE = 64 * 1024
+
+
+class DocumentsAdmin(tractdb.server.documents.DocumentsAdmin):
+    """ Supports management of TractDB documents, adding bulk operations.
+
+    Given a tractdb_pyramid.cache.DocumentCache, single document reads go through that
+    cache and our writes invalidate it. Given tractdb_pyramid.connections.CouchDBConnections,
+    requests use those shared connections, and given a tractdb_pyramid.connections.CookieAuthentication
+    they authenticate with its cookie instead of the password.
+    """
+
+    def __init__(self, couchdb_url, couchdb_user, couchdb_user_password, document_cache=None, connections=None, cookie_authentication=None):
+        """ Create an admin object.
+        """
+        super().__init__(
+            couchdb_url=couchdb_url,
+            couchdb_user=couchdb_user,
+            couchdb_user_password=couchdb_user_password
+        )
+
+        self._document_cache = document_cache
+        self._connections = connections
+        self._cookie_authentication = cookie_authentication
+
+    def changes(self, since=None, feed='normal', timeout=None, limit=None, include_docs=False, heartbeat=None):
+        """ Get the changes to the documents of the account since a sequence.
+
+        With feed 'longpoll', the request waits up to timeout milliseconds for a change if
+        there are none, and CouchDB sends a newline every heartbeat milliseconds while it waits.
+        Returns the CouchDB result, which contains 'results' and 'last_seq'.
+        """
+        database = self._couchdb_database
+
+        # Our options, CouchDB defaults for any we were not given
+        options = {
+            'feed': feed
+        }
+        if since is not None:
+            options['since'] = since
+        if timeout is not None:
+            options['timeout'] = timeout
+        if limit is not None:
+            options['limit'] = limit
+        if include_docs:
+            options['include_docs'] = 'true'
+        if heartbeat is not None:
+            options['heartbeat'] = heartbeat
+
+        return database.changes(**options)
+
+    def create_attachment(self, doc, name, content, content_type=None):
+        """ Add an attachment to a document, in a single request.
+
+        Only the id and revision of doc are used, so it need not include the document body.
+        Raises couchdb.http.ResourceConflict if the revision is not current.
+        """
+        database = self._couchdb_database
+
+        # Add the attachment, which updates the revision of our copy
+        doc = {
+            '_id': doc['_id'],
+            '_rev': doc['_rev']
+        }
+
+        try:
+            database.put_attachment(doc, content, filename=name, content_type=content_type)
+        finally:
+            self._invalidate_cached_document(doc['_id'])
+
+        return {
+            'id': doc['_id'],
+            'rev': doc['_rev']
+        }
+
+    def create_document(self, doc, doc_id=None):
+        """ Add a document to a database.
+        """
+        result = super().create_document(doc, doc_id=doc_id)
+        self._invalidate_cached_document(result['id'])
+
+        return result
+
+    def delete_attachment(self, doc_id, name, doc_rev=None):
+        """ Delete an attachment, without reading the document body.
+
+        Given its revision, this is a single request. Raises couchdb.http.ResourceNotFound
+        if the document or attachment does not exist and couchdb.http.ResourceConflict if
+        the revision is not current.
+        """
+        database = self._couchdb_database
+
+        # Without a revision, we first need the current revision
+        if doc_rev is None:
+            doc_rev = self.get_document_revision(doc_id)
+            if doc_rev is None:
+                raise couchdb.http.ResourceNotFound(('not_found', 'missing'))
+
+        # Delete it
+        try:
+            database.delete_attachment({'_id': doc_id, '_rev': doc_rev}, filename=name)
+        finally:
+            self._invalidate_cached_document(doc_id)
+
+    def delete_document(self, doc_id, doc_rev=None):
+        """ Delete a doc.
+
+        Given its revision, this is a single request. Raises couchdb.http.ResourceNotFound
+        if the document does not exist and couchdb.http.ResourceConflict if the revision
+        is not current.
+        """
+        database = self._couchdb_database
+
+        # Without a revision, we first need the current revision
+        if doc_rev is None:
+            doc_rev = self.get_document_revision(doc_id)
+            if doc_rev is None:
+                raise couchdb.http.ResourceNotFound(('not_found', 'missing'))
+
+        # Delete it
+        try:
+            _document_resource(database, doc_id).delete_json(rev=doc_rev)
+        finally:
+            self._invalidate_cached_document(doc_id)
+
+    def exists_document(self, doc_id):
+        """ Check whether a document exists, without reading its body.
+        """
+        # A fresh cached document is known to exist
+        if self._document_cache is not None:
+            cached = self._document_cache.get(self._couchdb_user, doc_id)
+            if cached is not None and cached[1]:
+                self._document_cache.record_hit()
+                return True
+
+        return self.get_document_revision(doc_id) is not None
+
+    def get_attachment_info(self, doc_id, name):
+        """ Get what we know of an attachment without reading it or its document.
+
+        Returns a dict with 'content_type', 'content_length', and 'etag', the version of the
+        attachment that CouchDB reports as its ETag, or None if the document or attachment
+        does not exist.
+        """
+        database = self._couchdb_database
+
+        try:
+            _, headers, _ = _document_resource(database, doc_id).head(name)
+        except couchdb.http.ResourceNotFound:
+            return None
+
+        content_length = headers.get('content-length', None)
+        etag = headers.get('etag', None)
+
+        return {
+            'content_type': headers.get('content-type', None),
+            'content_length': int(content_length) if content_length is not None else None,
+            'etag': etag.strip('"') if etag is not None else None
+        }
+
+    def get_document(self, doc_id):
+        """ Get a document in a single request, raising if it does not exist.
+        """
+        doc = self._get_document_cached(doc_id)
+        if doc is None:
+            raise Exception('Document "{:s}" does not exist.'.format(doc_id))
+
+        return doc
+
+    def get_document_if_exists(self, doc_id, fields=None):
+        """ Get a document in a single request, or None if it does not exist.
+
+        If fields is provided, the document includes only those fields plus its id and revision.
+        """
+        doc = self._get_document_cached(doc_id)
+        if doc is None:
+            return None
+
+        return _project_document(doc, fields)
+
+    def get_document_revision(self, doc_id):
+        """ Get the current revision of a document without its body, or None if it does not exist.
+        """
+        database = self._couchdb_database
+
+        # CouchDB reports the revision as the ETag of the document
+        try:
+            _, headers, _ = _document_resource(database, doc_id).head()
+        except couchdb.http.ResourceNotFound:
+            return None
+
+        return headers['etag'].strip('"')
+
+    def get_documents(self, startkey=None, limit=None, prefix=None, fields=None):
+        """ Get the documents of the account, ids and bodies in a single request.
+
+        Documents are ordered by id. If provided, startkey is the first id to include,
+        limit is the maximum number of documents to return, and prefix restricts to ids
+        that start with it. If fields is provided, each document includes only those
+        fields plus its id and revision.
+        """
+        database = self._couchdb_database
+
+        # Read the documents in our range of ids, including their bodies
+        options = _all_docs_range_options(startkey=startkey, prefix=prefix)
+        if limit is not None:
+            options['limit'] = limit
+
+        rows = database.view('_all_docs', **options)
+
+        # Return as dicts, not our CouchDB internal objects
+        return [_project_document(row['doc'], fields) for row in rows]
+
+    def get_documents_by_id(self, doc_ids):
+        """ Get the documents with the given ids, in a single request.
+
+        Returns a dict from id to document, which omits any id that does not exist.
+        """
+        database = self._couchdb_database
+
+        # Read the documents by key, including their bodies
+        rows = database.view('_all_docs', keys=list(doc_ids), include_docs=True)
+
+        # Missing documents have an error and deleted documents have no body
+        return {
+            row['id']: dict(row['doc']) for row in rows if row.get('doc')
+        }
+
+    def iter_documents(self, startkey=None, prefix=None, fields=None, batch=100):
+        """ Iterate over the documents of the account, ids and bodies read in batches.
+
+        Documents are ordered by id. Only a batch of documents is held at a time, so
+        memory use does not grow with the number of documents in the account. If
+        provided, startkey is the first id to include and prefix restricts to ids that
+        start with it. If fields is provided, each document includes only those fields
+        plus its id and revision.
+        """
+        database = self._couchdb_database
+
+        # Read the documents in our range of ids in batches, including their bodies
+        options = _all_docs_range_options(startkey=startkey, prefix=prefix)
+
+        for row in database.iterview('_all_docs', batch, **options):
+            # Return as dicts, not our CouchDB internal objects
+            yield _project_document(row['doc'], fields)
+
+    def open_attachment(self, doc_id, name, byte_range=None):
+        """ Open an attachment for streaming, in a single request.
+
+        Returns a dict with 'status', 'content_type', 'content_length', 'content_range', and
+        'content', an iterator over the attachment in chunks, or None if the document or
+        attachment does not exist. Only a chunk is held at a time, so memory use does not grow
+        with the size of the attachment.
+
+        If provided, byte_range is the value of a Range header that is sent to CouchDB. If
+        CouchDB honors it, the status is 206 and content_range is its Content-Range. If the
+        range cannot be satisfied, the status is 416 and there is no content.
+        """
+        database = self._couchdb_database
+
+        headers = {}
+        if byte_range is not None:
+            headers['Range'] = byte_range
+
+        try:
+            status, headers, data = _document_resource(database, doc_id).get(name, headers=headers)
+        except couchdb.http.ResourceNotFound:
+            return None
+        except couchdb.http.ServerError as e:
+            if e.args[0][0] != 416:
+                raise
+
+            return {
+                'status': 416,
+                'content_type': None,
+                'content_length': 0,
+                'content_range': None,
+                'content': iter(())
+            }
+
+        content_length = headers.get('content-length', None)
+
+        return {
+            'status': status,
+            'content_type': headers.get('content-type', None),
+            'content_length': int(content_length) if content_length is not None else None,
+            'content_range': headers.get('content-range', None),
+            'content': _iter_attachment(data)
+        }
+
+    def put_document(self, doc, doc_id, doc_rev=None):
+        """ Create a document, or update it if given its current revision, in a single request.
+
+        Raises couchdb.http.ResourceConflict if the document exists and the revision is
+        missing or is not current.
+        """
+        database = self._couchdb_database
+
+        # Ensure we have 'just' a dictionary, with the id and revision we were given
+        doc = dict(doc)
+        doc['_id'] = doc_id
+        doc.pop('_rev', None)
+        if doc_rev is not None:
+            doc['_rev'] = doc_rev
+
+        # Store the document
+        try:
+            new_doc_id, new_doc_rev = database.save(doc)
+        finally:
+            self._invalidate_cached_document(doc_id)
+
+        return {
+            'id': new_doc_id,
+            'rev': new_doc_rev
+        }
+
+    def update_document(self, doc, doc_id=None, doc_rev=None):
+        """ Update a doc.
+        """
+        try:
+            return super().update_document(doc, doc_id=doc_id, doc_rev=doc_rev)
+        finally:
+            self._invalidate_cached_document(doc_id if doc_id is not None else doc.get('_id', None))
+
+    def update_documents(self, docs):
+        """ Create or update documents in a single request.
+
+        A document may include an '_id', and must include its current '_rev' to update an
+        existing document. Returns the CouchDB result for each document, in order, which
+        contains either 'id' and 'rev' or 'id', 'error', and 'reason'.
+        """
+        database = self._couchdb_database
+
+        # Store the documents
+        _, _, results = database.resource.post_json(
+            '_bulk_docs',
+            body={
+                'docs': [dict(doc) for doc in docs]
+            }
+        )
+
+        for result in results:
+            self._invalidate_cached_document(result.get('id', None))
+
+        return results
+
+    def _get_document_cached(self, doc_id):
+        """ Get a document as a dict, or None if it does not exist.
+
+        Without a cache, this is a single request. A fresh cached document requires no
+        request, and a cached document that is not fresh is revalidated by revision.
+        """
+        database = self._couchdb_database
+        cache = self._document_cache
+
+        if cache is not None:
+            cached = cache.get(self._couchdb_user, doc_id)
+            if cached is not None:
+                doc, fresh = cached
+                if fresh:
+                    cache.record_hit()
+                    return doc
+
+                # Confirm the revision is still current, which does not transfer the body
+                if self.get_document_revision(doc_id) == doc['_rev']:
+                    cache.revalidated(self._couchdb_user, doc_id)
+                    cache.record_revalidation()
+                    return doc
+
+            cache.record_miss()
+
+        # Get the document
+        doc = database.get(doc_id)
+        if doc is None:
+            self._invalidate_cached_document(doc_id)
+            return None
+
+        # Return as a dict, not our CouchDB internal object
+        doc = dict(doc)
+
+        if cache is not None:
+            cache.put(self._couchdb_user, doc_id, doc)
+
+        return doc
+
+    def _invalidate_cached_document(self, doc_id):
+        """ Remove a document from our cache, after we have written it.
+        """
+        if self._document_cache is not None and doc_id is not None:
+            self._document_cache.invalidate(self._couchdb_user, doc_id)
+
+    @property
+    def _couchdb_server(self):
+        """ The server, using our shared connections if we have them.
+        """
+        if self._connections is None:
+            return super()._couchdb_server
+
+        if self._cookie_authentication is not None:
+            return self._connections.cookie_server(self._cookie_authentication)
+
+        return self._connections.server(self._couchdb_user, self._couchdb_user_password)
+
+    @property
+    def _couchdb_database(self):
+        """ The database of the account.
+
+        Unlike the checks in each of our parent's methods, this does not issue any
+        requests. A missing database will raise on first use.
+        """
+        server = self._couchdb_server
+        dbname = '{:s}_tractdb'.format(self._couchdb_user)
+
+        return couchdb.Database(server.resource(dbname), dbname)
+
+
+class RequestDocumentsAdmin(object):
+    """ Wraps a DocumentsAdmin for a single request, remembering the documents it reads and writes.
+
+    Repeated reads of a document within the request go to CouchDB once, an existence check
+    is answered by a prior read, and our writes update what we remember. Reads of ranges of
+    documents are not remembered. Any other method is passed to the wrapped admin object.
+    Not for sharing across requests or threads.
+    """
+
+    def __init__(self, admin):
+        """ Wrap an admin object.
+        """
+        self._admin = admin
+
+        # Documents we have read or written, None if we know the document does not exist
+        self._docs = {}
+        # Documents we have checked exist, but not read
+        self._exists = {}
+
+    def __getattr__(self, name):
+        return getattr(self._admin, name)
+
+    def create_attachment(self, doc, name, content, content_type=None):
+        """ Add an attachment to a document.
+        """
+        self._forget(doc['_id'])
+
+        return self._admin.create_attachment(doc, name, content, content_type=content_type)
+
+    def create_document(self, doc, doc_id=None):
+        """ Add a document to a database.
+        """
+        result = self._write(doc_id, self._admin.create_document, doc, doc_id=doc_id)
+        self._remember(doc, result)
+
+        return result
+
+    def delete_attachment(self, doc_id, name, doc_rev=None):
+        """ Delete an attachment.
+        """
+        self._forget(doc_id)
+
+        self._admin.delete_attachment(doc_id, name, doc_rev=doc_rev)
+
+    def delete_document(self, doc_id, doc_rev=None):
+        """ Delete a doc.
+        """
+        self._write(doc_id, self._admin.delete_document, doc_id, doc_rev=doc_rev)
+        self._docs[doc_id] = None
+
+    def exists_document(self, doc_id):
+        """ Check whether a document exists, answered by any prior read.
+        """
+        if doc_id in self._docs:
+            return self._docs[doc_id] is not None
+
+        if doc_id not in self._exists:
+            self._exists[doc_id] = self._admin.exists_document(doc_id)
+
+        return self._exists[doc_id]
+
+    def get_document(self, doc_id):
+        """ Get a document, raising if it does not exist.
+        """
+        doc = self.get_document_if_exists(doc_id)
+        if doc is None:
+            raise Exception('Document "{:s}" does not exist.'.format(doc_id))
+
+        return doc
+
+    def get_document_if_exists(self, doc_id, fields=None):
+        """ Get a document, or None if it does not exist.
+        """
+        if doc_id not in self._docs:
+            self._docs[doc_id] = self._admin.get_document_if_exists(doc_id)
+            self._exists.pop(doc_id, None)
+
+        doc = self._docs[doc_id]
+        if doc is None:
+            return None
+
+        # Callers may modify what we return, so keep our own copy
+        return _project_document(copy.deepcopy(doc), fields)
+
+    def get_document_revision(self, doc_id):
+        """ Get the current revision of a document, or None if it does not exist.
+        """
+        if doc_id in self._docs:
+            doc = self._docs[doc_id]
+            return doc['_rev'] if doc is not None else None
+
+        return self._admin.get_document_revision(doc_id)
+
+    def get_documents_by_id(self, doc_ids):
+        """ Get the documents with the given ids, reading only those we have not already read.
+        """
+        doc_ids = list(doc_ids)
+
+        doc_ids_unread = [doc_id for doc_id in doc_ids if doc_id not in self._docs]
+        if doc_ids_unread:
+            docs_read = self._admin.get_documents_by_id(doc_ids_unread)
+            for doc_id in doc_ids_unread:
+                self._docs[doc_id] = docs_read.get(doc_id, None)
+                self._exists.pop(doc_id, None)
+
+        return {
+            doc_id: copy.deepcopy(self._docs[doc_id]) for doc_id in doc_ids if self._docs[doc_id] is not None
+        }
+
+    def put_document(self, doc, doc_id, doc_rev=None):
+        """ Create a document, or update it if given its current revision.
+        """
+        result = self._write(doc_id, self._admin.put_document, doc, doc_id, doc_rev=doc_rev)
+        self._remember(doc, result)
+
+        return result
+
+    def update_document(self, doc, doc_id=None, doc_rev=None):
+        """ Update a doc.
+        """
+        doc_id = doc_id if doc_id is not None else doc.get('_id', None)
+
+        result = self._write(doc_id, self._admin.update_document, doc, doc_id=doc_id, doc_rev=doc_rev)
+        self._remember(doc, result)
+
+        return result
+
+    def update_documents(self, docs):
+        """ Create or update documents in a single request.
+        """
+        docs = list(docs)
+
+        results = self._admin.update_documents(docs)
+        for doc, result in zip(docs, results):
+            if 'rev' in result:
+                self._remember(doc, result)
+            else:
+                self._forget(result.get('id', None))
+
+        return results
+
+    def _forget(self, doc_id):
+        """ Forget what we know of a document.
+        """
+        self._docs.pop(doc_id, None)
+        self._exists.pop(doc_id, None)
+
+    def _remember(self, doc, result):
+        """ Remember a document we wrote, as stored with the id and revision CouchDB gave it.
+
+        A document written with '_deleted' is remembered as not existing.
+        """
+        self._exists.pop(result['id'], None)
+
+        if doc.get('_deleted', False):
+            self._docs[result['id']] = None
+            return
+
+        doc = copy.deepcopy(dict(doc))
+        doc['_id'] = result['id']
+        doc['_rev'] = result['rev']
+
+        self._docs[result['id']] = doc
+
+    def _write(self, written_doc_id, write, *args, **kwargs):
+        """ Perform a write, forgetting the document if it fails.
+        """
+        try:
+            return write(*args, **kwargs)
+        except Exception:
+            self._forget(written_doc_id)
+            raise
+
+
+def request_documents_admin(request):
+    """ The documents admin object for the account of a request, for use throughout the request.
+
+    Registered as a reified request method, so it is created once per request.
+    """
+    admin = DocumentsAdmin(
+        couchdb_url=request.registry.settings['tractdb_couchdb'],
+        couchdb_user=request.session['temp_couchdb_user'],
+        couchdb_user_password=request.session['temp_couchdb_user_password'],
+        document_cache=request.registry.tractdb_document_cache,
+        connections=request.registry.tractdb_couchdb_connections,
+        cookie_authentication=tractdb_pyramid.connections.cookie_authentication(request)
+    )
+
+    return RequestDocumentsAdmin(admin)
+
+
+def _document_resource(database, doc_id):
+    """ The resource of a document in a database.
+
+    As in couchdb.client, the / in an id such as '_design/name' or '_local/name' is not escaped.
+    """
+    if doc_id[:1] == '_':
+        return database.resource(*doc_id.split('/', 1))
+
+    return database.resource(doc_id)
+
+
+def _iter_attachment(data):
+    """ Iterate over the chunks of an attachment as it is read from CouchDB.
+    """
+    completed = False
+    try:
+        while True:
+            chunk = data.read(ATTACHMENT_CHUNK_SIZE)
+            if not chunk:
+                break
+
+            yield chunk
+
+        completed = True
+    finally:
+        if completed or not isinstance(data, couchdb.http.ResponseBody):
+            data.close()
+        elif data.conn is not None:
+            # The client went away, so rather than reading the rest of the attachment
+            # only to reuse the connection, we close it
+            data.resp.close()
+            data.conn.close()
+            data.conn = None
+
+
+def _all_docs_range_options(startkey, prefix):
+    """ Options to read a range of ids from _all_docs, including document bodies.
+
+    A prefix becomes a key range, so only the matching ids are read.
+    """
+    options = {
+        'include_docs': True
+    }
+
+    if prefix is not None:
+        # Ids are collated by code point, so this bounds every id with the prefix
+        options['startkey'] = prefix
+        options['endkey'] = prefix + '\ufff0'
+
+    if startkey is not None:
+        options['startkey'] = max(startkey, options.get('startkey', startkey))
+
+    return options
+
+
+def _project_document(doc, fields):
+    """ Convert a CouchDB document to a dict, keeping only the given fields if provided.
+
+    The id and revision are always kept.
+    """
+    if fields is None:
+        return dict(doc)
+
+    return {
+        key: value for key, value in doc.items() if key in fields or key in ('_id', '_rev')
+    }
@@ -0,0 +1,85 @@
+import collections
+import decimal
+import json
+import pyramid.renderers
+
+try:
+    import simplejson
+except ImportError:
+    simplejson = None
+
+
+def _installed_backends():
+    """ The JSON backends that are installed, fastest first.
+
+    Each is a function from a value to a str, raising TypeError or ValueError if the value
+    contains anything the backend cannot encode. Only the stdlib backend is always installed.
+    """
+    backends = collections.OrderedDict()
+
+    try:
+        import orjson
+    except ImportError:
+        pass
+    else:
+        backends['orjson'] = lambda value: orjson.dumps(value).decode('utf-8')
+
+    try:
+        import ujson
+    except ImportError:
+        pass
+    else:
+        backends['ujson'] = lambda value: ujson.dumps(value, escape_forward_slashes=False)
+
+    try:
+        import rapidjson
+    except ImportError:
+        pass
+    else:
+        backends['rapidjson'] = rapidjson.dumps
+
+    backends['json'] = lambda value: json.dumps(value, separators=(',', ':'))
+
+    return backends
+
+
+# Every backend we can use, and the one we do use
+BACKENDS = _installed_backends()
+BACKEND = next(iter(BACKENDS))
+
+_backend_dumps = BACKENDS[BACKEND]
+
+
+def dumps(value, default=None, use_decimal=True, **kw):
+    """ Encode a value as JSON, using the fastest installed backend.
+
+    Anything the backend cannot encode, such as an object that is converted by default,
+    is instead encoded by simplejson, or the stdlib if simplejson is not installed. As with
+    the simplejson renderer of cornice, Decimal values are encoded as numbers unless
+    use_decimal is False. Other keyword arguments are accepted and ignored.
+    """
+    try:
+        return _backend_dumps(value)
+    except (TypeError, ValueError, OverflowError):
+        pass
+
+    if simplejson is not None:
+        return simplejson.dumps(value, default=default, use_decimal=use_decimal, separators=(',', ':'))
+
+    def default_decimal(o):
+        if use_decimal and isinstance(o, decimal.Decimal):
+            return float(o)
+        if default is None:
+            raise TypeError('Object of type {} is not JSON serializable'.format(type(o).__name__))
+
+        return default(o)
+
+    return json.dumps(value, default=default_decimal, separators=(',', ':'))
+
+
+def json_renderer_factory():
+    """ Create a JSON renderer that encodes with our dumps.
+
+    Registered as 'json', it is also used by the 'simplejson' renderer of cornice services.
+    """
+    return pyramid.renderers.JSON(serializer=dumps)
@@ -0,0 +1,30 @@
+import pyramid.response
+import tractdb_pyramid.renderers
+
+
+def json_collection_response(key, docs):
+    """ Create a response whose body is a JSON object containing a single list.
+
+    The list is encoded as docs is iterated, so each document is sent as soon as it
+    is read and the full list is never held in memory.
+    """
+    return pyramid.response.Response(
+        status_int=200,
+        content_type='application/json',
+        charset='utf-8',
+        app_iter=_iter_json_collection(key, docs)
+    )
+
+
+def _iter_json_collection(key, docs):
+    # Open the object and its list
+    yield '{{{}:['.format(tractdb_pyramid.renderers.dumps(key)).encode('utf-8')
+
+    # Each document, separated from the prior one
+    separator = ''
+    for doc in docs:
+        yield '{}{}'.format(separator, tractdb_pyramid.renderers.dumps(doc)).encode('utf-8')
+        separator = ','
+
+    # Close the list and the object
+    yield b']}'
@@ -2,7 +2,13 @@ import pyramid.authentication
 import pyramid.authorization
 import pyramid.config
 import pyramid.response
+import pyramid.settings
 import pyramid.view
+import tractdb_pyramid.accounts
+import tractdb_pyramid.cache
+import tractdb_pyramid.connections
+import tractdb_pyramid.documents
+import tractdb_pyramid.renderers
 import yaml
 
 
@@ -33,6 +39,63 @@ def main(global_config, **settings):
     config.set_authentication_policy(policy_authentication)
     config.set_authorization_policy(policy_authorization)
 
+    # Per-process CouchDB connections, kept alive and shared by all requests
+    config.registry.tractdb_couchdb_connections = tractdb_pyramid.connections.CouchDBConnections(
+        couchdb_url=settings['tractdb_couchdb'],
+        pool_size=int(settings.get('tractdb.couchdb.pool_size', 10)),
+        connect_timeout=float(settings.get('tractdb.couchdb.connect_timeout', 5)),
+        read_timeout=float(settings.get('tractdb.couchdb.read_timeout', 30)),
+        retries=int(settings.get('tractdb.couchdb.retries', 2)),
+        retry_delay=float(settings.get('tractdb.couchdb.retry_delay', 0.1)),
+        circuit_breaker=tractdb_pyramid.connections.CircuitBreaker(
+            threshold=float(settings.get('tractdb.couchdb.circuit_breaker.threshold', 0.5)),
+            window=int(settings.get('tractdb.couchdb.circuit_breaker.window', 20)),
+            minimum=int(settings.get('tractdb.couchdb.circuit_breaker.minimum', 10)),
+            reset_timeout=float(settings.get('tractdb.couchdb.circuit_breaker.reset_timeout', 30))
+        )
+    )
+
+    # Per-process accounts admin, since its admin credentials never change
+    config.registry.tractdb_accounts_admin = tractdb_pyramid.accounts.AccountsAdmin(
+        couchdb_url=settings['tractdb_couchdb'],
+        couchdb_admin=settings['secrets']['couchdb']['admin']['user'],
+        couchdb_admin_password=settings['secrets']['couchdb']['admin']['password'],
+        connections=config.registry.tractdb_couchdb_connections
+    )
+
+    # Per-process document cache, disabled unless given a size
+    document_cache_size = int(settings.get('tractdb.document_cache.size', 0))
+    if document_cache_size > 0:
+        config.registry.tractdb_document_cache = tractdb_pyramid.cache.DocumentCache(
+            size=document_cache_size,
+            ttl=float(settings.get('tractdb.document_cache.ttl', 60))
+        )
+    else:
+        config.registry.tractdb_document_cache = None
+
+    # Largest attachment accepted in an upload, unlimited when 0
+    config.registry.tractdb_attachment_max_size = int(settings.get('tractdb.attachments.max_size', 0))
+
+    # Cache-Control of attachment downloads, which are revalidated by their digest
+    config.registry.tractdb_attachment_cache_control = settings.get(
+        'tractdb.attachments.cache_control',
+        'private, no-cache'
+    ) or None
+
+    # JSON responses, including those of cornice services, use the fastest installed backend
+    config.add_renderer('json', tractdb_pyramid.renderers.json_renderer_factory())
+
+    # Each request shares a documents admin object, which remembers what the request reads
+    config.add_request_method(
+        tractdb_pyramid.documents.request_documents_admin,
+        'tractdb_documents_admin',
+        reify=True
+    )
+
+    # Compress responses, unless disabled
+    if pyramid.settings.asbool(settings.get('tractdb.compression', True)):
+        config.add_tween('tractdb_pyramid.tweens.compression_tween_factory')
+
     # Application views
     config.scan('tractdb_pyramid.views')
 
@@ -0,0 +1,88 @@
+import gzip
+import zlib
+
+# Content types that we compress, all of our JSON responses are one of these
+COMPRESSIBLE_CONTENT_TYPES = ('application/json', 'text/json')
+
+
+def compression_tween_factory(handler, registry):
+    """ A tween that compresses JSON responses with gzip, if the client accepts it.
+
+    Configured by 'tractdb.compression.minimum_size', the smallest body in bytes that is
+    compressed, and 'tractdb.compression.level', from 1 (fastest) to 9 (smallest).
+    """
+    minimum_size = int(registry.settings.get('tractdb.compression.minimum_size', 1024))
+    level = int(registry.settings.get('tractdb.compression.level', 6))
+
+    def compression_tween(request):
+        response = handler(request)
+
+        # Only responses with a body we know how to compress
+        if response.content_type not in COMPRESSIBLE_CONTENT_TYPES:
+            return response
+        if request.method == 'HEAD' or response.status_int in (204, 206, 304):
+            return response
+        if response.content_encoding is not None:
+            return response
+
+        # A validator or byte ranges would describe the uncompressed body, not what we send
+        if response.etag is not None or response.accept_ranges is not None:
+            return response
+
+        # Caches must distinguish compressed and uncompressed variants
+        response.vary = tuple(response.vary or ()) + ('Accept-Encoding',)
+
+        if not _accepts_gzip(request):
+            return response
+
+        if response.content_length is not None and response.content_length < minimum_size:
+            return response
+
+        # A streamed response is compressed as it is streamed, rather than read into memory
+        if isinstance(response.app_iter, (list, tuple)):
+            response.body = gzip.compress(response.body, compresslevel=level)
+        else:
+            response.app_iter = _iter_gzip(response.app_iter, level)
+            response.content_length = None
+
+        response.content_encoding = 'gzip'
+
+        return response
+
+    return compression_tween
+
+
+def _accepts_gzip(request):
+    # Whether the Accept-Encoding header includes gzip, or any encoding, with a nonzero quality
+    for encoding in request.headers.get('Accept-Encoding', '').split(','):
+        name, _, parameters = encoding.partition(';')
+        if name.strip().lower() not in ('gzip', '*'):
+            continue
+
+        quality = parameters.strip()
+        if quality.startswith('q='):
+            try:
+                if float(quality[len('q='):]) <= 0:
+                    continue
+            except ValueError:
+                continue
+
+        return True
+
+    return False
+
+
+def _iter_gzip(app_iter, level):
+    # A gzip stream, rather than a raw deflate stream
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    try:
+        for chunk in app_iter:
+            compressed = compressor.compress(chunk)
+            if compressed:
+                yield compressed
+
+        yield compressor.flush()
+    finally:
+        if hasattr(app_iter, 'close'):
+            app_iter.close()
@@ -1,6 +1,5 @@
 import cornice
 import pyramid.security
-import tractdb.server.accounts
 
 
 def acl_authenticated(request):
@@ -30,14 +29,8 @@ service_role_collection = cornice.Service(
 
 
 def _get_admin(request):
-    # Create our admin object
-    admin = tractdb.server.accounts.AccountsAdmin(
-        couchdb_url=request.registry.settings['tractdb_couchdb'],
-        couchdb_admin=request.registry.settings['secrets']['couchdb']['admin']['user'],
-        couchdb_admin_password=request.registry.settings['secrets']['couchdb']['admin']['password']
-    )
-
-    return admin
+    # Our admin object, shared by all requests
+    return request.registry.tractdb_accounts_admin
 
 
 @service_role.delete(permission='authenticated')
@@ -52,13 +45,14 @@ def delete(request):
     # Our admin object
     admin = _get_admin(request)
 
-    # Check if the account exists
-    if account not in admin.list_accounts():
+    # Check if the account exists, getting its roles
+    doc_account = admin.get_account(account)
+    if doc_account is None:
         request.response.status_int = 404
         return
 
     # Check if the role exists
-    if role not in admin.list_roles(account):
+    if role not in doc_account['roles']:
         request.response.status_int = 404
         return
 
@@ -80,13 +74,14 @@ def collection_get(request):
     # Our admin object
     admin = _get_admin(request)
 
-    # Check if the account exists
-    if account not in admin.list_accounts():
+    # Check if the account exists, getting its roles
+    doc_account = admin.get_account(account)
+    if doc_account is None:
         request.response.status_int = 404
         return
 
     # Get the roles
-    list_roles = admin.list_roles(account)
+    list_roles = doc_account['roles']
 
     # Return appropriately
     request.response.status_int = 200
@@ -111,13 +106,14 @@ def collection_post(request):
     # Our admin object
     admin = _get_admin(request)
 
-    # Check if the account exists
-    if account not in admin.list_accounts():
+    # Check if the account exists, getting its roles
+    doc_account = admin.get_account(account)
+    if doc_account is None:
         request.response.status_int = 404
         return
 
     # Check if the role exists
-    if role in admin.list_roles(account):
+    if role in doc_account['roles']:
         request.response.status_int = 409
         return
 
@@ -1,6 +1,5 @@
 import cornice
 import pyramid.security
-import tractdb.server.accounts
 
 
 def acl_authenticated(request):
@@ -30,14 +29,8 @@ service_account_collection = cornice.Service(
 
 
 def _get_admin(request):
-    # Create our admin object
-    admin = tractdb.server.accounts.AccountsAdmin(
-        couchdb_url=request.registry.settings['tractdb_couchdb'],
-        couchdb_admin=request.registry.settings['secrets']['couchdb']['admin']['user'],
-        couchdb_admin_password=request.registry.settings['secrets']['couchdb']['admin']['password']
-    )
-
-    return admin
+    # Our admin object, shared by all requests
+    return request.registry.tractdb_accounts_admin
 
 
 # TODO: need something stronger here
@@ -53,7 +46,7 @@ def delete(request):
     admin = _get_admin(request)
 
     # Check if the account exists
-    if account not in admin.list_accounts():
+    if not admin.exists_account(account):
         request.response.status_int = 404
         return
 
@@ -95,7 +88,7 @@ def collection_post(request):
     admin = _get_admin(request)
 
     # Check if the account exists
-    if account in admin.list_accounts():
+    if admin.exists_account(account):
         request.response.status_int = 409
         return
 
@@ -129,7 +122,7 @@ def collection_post(request):
 #
 #
 #     # Check if the account does not exist
-#     if account not in admin.list_accounts():
+#     if not admin.exists_account(account):
 #         request.response.status_int = 409
 #         return
 #
@@ -1,7 +1,6 @@
 import cornice
 import couchdb.http
 import pyramid.security
-import tractdb.server.documents
 
 
 def acl_authenticated(request):
@@ -31,14 +30,76 @@ service_attachment_collection = cornice.Service(
 
 
 def _get_admin(request):
-    # Create our admin object
-    admin = tractdb.server.documents.DocumentsAdmin(
-        couchdb_url=request.registry.settings['tractdb_couchdb'],
-        couchdb_user=request.session['temp_couchdb_user'],
-        couchdb_user_password=request.session['temp_couchdb_user_password']
-    )
+    # Our admin object, shared by the rest of this request
+    return request.tractdb_documents_admin
+
+
+class _UploadTooLarge(Exception):
+    """ An upload exceeded our maximum attachment size while it was being read.
+    """
+
+
+class _UploadBody(object):
+    """ The body of an upload, read in chunks as it is sent to CouchDB.
+
+    Raises _UploadTooLarge once more than max_size bytes have been read, unless max_size is 0.
+    """
+
+    def __init__(self, body_file, max_size):
+        self._body_file = body_file
+        self._max_size = max_size
+        self._size = 0
+
+    def read(self, size=-1):
+        chunk = self._body_file.read(size)
+
+        self._size += len(chunk)
+        if self._max_size and self._size > self._max_size:
+            raise _UploadTooLarge()
+
+        return chunk
+
 
-    return admin
+def _get_upload_body(request):
+    """ The body of an attachment upload, or None if it is known to be too large.
+    """
+    max_size = request.registry.tractdb_attachment_max_size
+
+    # Reject an upload before reading it, if its Content-Length is too large
+    if max_size and request.content_length is not None and request.content_length > max_size:
+        return None
+
+    return _UploadBody(request.body_file, max_size)
+
+
+def _if_range_matches(request, etag):
+    """ Whether a Range applies, given the If-Range of a request.
+
+    Only an entity tag If-Range is compared, a date never matches.
+    """
+    if_range = request.headers.get('If-Range', None)
+    if if_range is None:
+        return True
+
+    return etag is not None and if_range.strip() == '"{}"'.format(etag)
+
+
+def _iter_range(chunks, start, stop):
+    """ Iterate over the bytes from start up to stop of an iterator over chunks.
+    """
+    position = 0
+    try:
+        for chunk in chunks:
+            chunk_start = max(start - position, 0)
+            chunk_stop = min(stop - position, len(chunk))
+            position += len(chunk)
+
+            if chunk_start < chunk_stop:
+                yield chunk[chunk_start:chunk_stop]
+            if position >= stop:
+                break
+    finally:
+        chunks.close()
 
 
 @service_attachment.delete(permission='authenticated')
@@ -52,15 +113,15 @@ def delete(request):
     # Our admin object
     admin = _get_admin(request)
 
-    # Get the document
-    doc = admin.get_document(doc_id)
-
-    if attachment_name not in doc.get('_attachments', []):
+    # Delete it, which fails if the document or attachment does not exist
+    try:
+        admin.delete_attachment(doc_id, attachment_name)
+    except couchdb.http.ResourceNotFound:
         request.response.status_int = 404
         return
-
-    # Delete it
-    admin.delete_attachment(doc_id, attachment_name)
+    except couchdb.http.ResourceConflict:
+        request.response.status_int = 409
+        return
 
     # Return appropriately
     request.response.status_int = 200
@@ -77,21 +138,72 @@ def get(request):
     # Our admin object
     admin = _get_admin(request)
 
-    # Get the document
-    doc = admin.get_document(doc_id)
+    # Get what we know of the attachment, without reading it or its document
+    attachment_info = admin.get_attachment_info(doc_id, attachment_name)
+    if attachment_info is None:
+        request.response.status_int = 404
+        return
 
-    if attachment_name not in doc.get('_attachments', []):
+    # Our version of the attachment is its digest, which CouchDB reports as its ETag
+    attachment_etag = attachment_info['etag']
+
+    request.response.etag = attachment_etag
+    if request.registry.tractdb_attachment_cache_control is not None:
+        request.response.cache_control = request.registry.tractdb_attachment_cache_control
+
+    # A client with this version need not be sent it again
+    if attachment_etag is not None and attachment_etag in request.if_none_match:
+        request.response.status_int = 304
+        return request.response
+
+    # A single requested range, unless If-Range names another version
+    byte_range = request.range
+    if byte_range is not None:
+        if ',' in request.headers['Range'] or not _if_range_matches(request, attachment_etag):
+            byte_range = None
+
+    # Open the attachment, which is streamed as it is sent
+    attachment = admin.open_attachment(
+        doc_id,
+        attachment_name,
+        byte_range=str(byte_range) if byte_range is not None else None
+    )
+    if attachment is None:
         request.response.status_int = 404
         return
 
-    # Get the attachment
-    result = admin.get_attachment(doc_id, attachment_name)
+    request.response.accept_ranges = 'bytes'
+
+    if attachment['status'] == 416:
+        request.response.status_int = 416
+        request.response.content_range = 'bytes */{}'.format(attachment_info['content_length'])
+        return request.response
 
     # Return appropriately
-    request.response.status_int = 200
-    request.response.content_type = result['content_type']
-    request.response.body = result['content'].read()
-    result['content'].close()
+    request.response.status_int = attachment['status']
+    request.response.content_type = attachment['content_type']
+    request.response.app_iter = attachment['content']
+    request.response.content_length = attachment['content_length']
+    if attachment['status'] == 206:
+        request.response.content_range = attachment['content_range']
+        return request.response
+
+    # CouchDB sent the whole attachment, so send only our range of it
+    if byte_range is not None and attachment['content_length'] is not None:
+        content_range = byte_range.content_range(attachment['content_length'])
+        if content_range is None:
+            attachment['content'].close()
+
+            request.response.status_int = 416
+            request.response.app_iter = []
+            request.response.content_length = 0
+            request.response.content_range = 'bytes */{}'.format(attachment['content_length'])
+            return request.response
+
+        request.response.status_int = 206
+        request.response.app_iter = _iter_range(attachment['content'], content_range.start, content_range.stop)
+        request.response.content_length = content_range.stop - content_range.start
+        request.response.content_range = content_range
 
     return request.response
 
@@ -104,31 +216,41 @@ def post(request):
     doc_id = request.matchdict['id_document']
     attachment_name = request.matchdict['id_attachment']
 
-    # Attachment bytes and type
-    attachment_bytes = request.body
+    # Attachment body, streamed to CouchDB, and type
+    attachment_body = _get_upload_body(request)
     attachment_content_type = request.headers['Content-Type']
 
+    if attachment_body is None:
+        request.response.status_int = 413
+        return
+
     # Our admin object
     admin = _get_admin(request)
 
-    # Get the document
-    doc = admin.get_document(doc_id)
+    # Get the current revision of the document, without reading its body
+    doc_rev = admin.get_document_revision(doc_id)
+    if doc_rev is None:
+        request.response.status_int = 404
+        return
 
     # Create the attachment with that name
     try:
-        if attachment_name in doc.get('_attachments', []):
+        if admin.get_attachment_info(doc_id, attachment_name) is not None:
             request.response.status_int = 409
             return
 
         result = admin.create_attachment(
-            doc,
+            {'_id': doc_id, '_rev': doc_rev},
             attachment_name,
-            attachment_bytes,
+            attachment_body,
             content_type=attachment_content_type
         )
     except couchdb.http.ResourceConflict:
         request.response.status_int = 409
         return
+    except _UploadTooLarge:
+        request.response.status_int = 413
+        return
 
     # Return appropriately
     request.response.status_int = 201
@@ -147,27 +269,37 @@ def put(request):
     doc_id = request.matchdict['id_document']
     attachment_name = request.matchdict['id_attachment']
 
-    # Attachment bytes and type
-    attachment_bytes = request.body
+    # Attachment body, streamed to CouchDB, and type
+    attachment_body = _get_upload_body(request)
     attachment_content_type = request.headers['Content-Type']
 
+    if attachment_body is None:
+        request.response.status_int = 413
+        return
+
     # Our admin object
     admin = _get_admin(request)
 
-    # Get the document
-    doc = admin.get_document(doc_id)
+    # Get the current revision of the document, without reading its body
+    doc_rev = admin.get_document_revision(doc_id)
+    if doc_rev is None:
+        request.response.status_int = 404
+        return
 
     # Create the attachment with that name
     try:
         result = admin.create_attachment(
-            doc,
+            {'_id': doc_id, '_rev': doc_rev},
             attachment_name,
-            attachment_bytes,
+            attachment_body,
             content_type=attachment_content_type
         )
     except couchdb.http.ResourceConflict:
         request.response.status_int = 409
         return
+    except _UploadTooLarge:
+        request.response.status_int = 413
+        return
 
     # Return appropriately
     request.response.status_int = 200
@@ -188,8 +320,12 @@ def collection_get(request):
     # Our admin object
     admin = _get_admin(request)
 
-    # Get the document
-    doc = admin.get_document(doc_id)
+    # Get the document. CouchDB 1.x has no request for only the attachment stubs of a
+    # document, so unlike our other handlers this still reads the whole document.
+    doc = admin.get_document_if_exists(doc_id, fields=['_attachments'])
+    if doc is None:
+        request.response.status_int = 404
+        return
 
     # Get the attachment list
     attachments = doc.get('_attachments', [])
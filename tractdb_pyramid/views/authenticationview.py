@@ -2,6 +2,7 @@ import cornice
 import pyramid.security
 import pyramid.view
 import requests
+import time
 
 ################################################################################
 # A simple service that is accessible only when authenticated.
@@ -58,20 +59,29 @@ def login_post(request):
     account_password = json['password']
 
     # Attempt to authenticate with CouchDB
-    couchdb_response = requests.post(
-        '{}/_session'.format(_get_couchdb_url(request)),
-        data={
-            'name': account,
-            'password': account_password
-        }
-    )
+    try:
+        couchdb_response = requests.post(
+            '{}/_session'.format(_get_couchdb_url(request)),
+            data={
+                'name': account,
+                'password': account_password
+            },
+            timeout=request.registry.tractdb_couchdb_connections.timeout
+        )
+    except requests.RequestException:
+        request.response.status_int = 503
+        return
 
     # If we succeeded, we can issue a cookie
     if couchdb_response.status_code == 200:
         # Store the CouchDB cookies for communicating with CouchDB from this session
         request.session['couchdb_cookies'] = couchdb_response.cookies
+        request.session['couchdb_auth_session'] = {
+            'cookie': couchdb_response.cookies.get('AuthSession', None),
+            'obtained': time.time()
+        }
 
-        # TODO: until we can handle sessions in our server objects
+        # Our password is used only to refresh our cookie when it expires
         request.session['temp_couchdb_user'] = account
         request.session['temp_couchdb_user_password'] = account_password
 
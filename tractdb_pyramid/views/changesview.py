@@ -0,0 +1,101 @@
+import cornice
+import couchdb.http
+import pyramid.security
+import pyramid.settings
+
+
+def acl_authenticated(request):
+    return [
+        (pyramid.security.Allow, pyramid.security.Authenticated, 'authenticated'),
+        pyramid.security.DENY_ALL
+    ]
+
+
+service_changes = cornice.Service(
+    name='changes',
+    path='/changes',
+    description='TractDB Changes Feed',
+    cors_origins=('*',),
+    cors_credentials=True,
+    acl=acl_authenticated
+)
+
+# The longest a long-poll request may hold a worker thread, in milliseconds. Each waiting
+# request holds a thread, so the server needs more threads than waiting clients.
+TIMEOUT_MAX = 30000
+
+# While a long-poll waits, how often CouchDB sends a newline so the wait is not mistaken for a
+# CouchDB read timeout, in milliseconds
+HEARTBEAT = 10000
+
+
+def _get_admin(request):
+    # Our admin object, shared by the rest of this request
+    return request.tractdb_documents_admin
+
+
+@service_changes.get(permission='authenticated')
+def get(request):
+    """ Get the changes to documents since a sequence.
+
+    Accepts optional 'since', 'limit', and 'include_docs' parameters. With 'feed=longpoll',
+    waits up to 'timeout' milliseconds for a change if there are none yet. The response
+    includes 'results' and 'last_seq', which is the 'since' of the next request.
+    """
+    # Our parameters
+    since = request.params.get('since', None)
+    feed = request.params.get('feed', 'normal')
+    include_docs = pyramid.settings.asbool(request.params.get('include_docs', False))
+    try:
+        # A sequence is opaque to us, but is never negative
+        if since is not None and since.strip().startswith('-'):
+            raise ValueError('since must not be negative.')
+
+        timeout = request.params.get('timeout', None)
+        if timeout is not None:
+            timeout = int(timeout)
+            if timeout < 0:
+                raise ValueError('timeout must not be negative.')
+
+            timeout = min(timeout, TIMEOUT_MAX)
+        elif feed == 'longpoll':
+            timeout = TIMEOUT_MAX
+
+        limit = request.params.get('limit', None)
+        if limit is not None:
+            limit = int(limit)
+            if limit < 0:
+                raise ValueError('limit must not be negative.')
+    except ValueError:
+        request.response.status_int = 400
+        return
+
+    if feed not in ('normal', 'longpoll'):
+        request.response.status_int = 400
+        return
+
+    # Our admin object
+    admin = _get_admin(request)
+
+    # Get the changes
+    try:
+        changes = admin.changes(
+            since=since,
+            feed=feed,
+            timeout=timeout,
+            limit=limit,
+            include_docs=include_docs,
+            heartbeat=HEARTBEAT if feed == 'longpoll' else None
+        )
+    except couchdb.http.ServerError as e:
+        # CouchDB rejected our parameters
+        if not (isinstance(e.args[0], tuple) and e.args[0][0] == 400):
+            raise
+
+        request.response.status_int = 400
+        return
+
+    # Return appropriately
+    request.response.status_int = 200
+
+    return changes
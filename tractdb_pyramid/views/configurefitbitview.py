@@ -2,7 +2,6 @@ import base64
 import cornice
 import pyramid.security
 import requests
-import tractdb.server.documents
 
 
 def acl_authenticated(request):
@@ -23,14 +22,8 @@ service_configure_fitbit = cornice.Service(
 
 
 def _get_admin(request):
-    # Create our admin object
-    admin = tractdb.server.documents.DocumentsAdmin(
-        couchdb_url=request.registry.settings['tractdb_couchdb'],
-        couchdb_user=request.session['temp_couchdb_user'],
-        couchdb_user_password=request.session['temp_couchdb_user_password']
-    )
-
-    return admin
+    # Our admin object, shared by the rest of this request
+    return request.tractdb_documents_admin
 
 
 @service_configure_fitbit.post(permission='authenticated')
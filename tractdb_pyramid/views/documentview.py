@@ -1,7 +1,10 @@
+import collections
 import cornice
 import couchdb.http
 import pyramid.security
-import tractdb.server.documents
+import pyramid.settings
+import tractdb_pyramid.streaming
+import webob.etag
 
 
 def acl_authenticated(request):
@@ -29,35 +32,130 @@ service_document_collection = cornice.Service(
     acl=acl_authenticated
 )
 
+service_document_bulk = cornice.Service(
+    name='documents_bulk',
+    path='/documents/_bulk',
+    description='TractDB Documents Bulk Write',
+    cors_origins=('*',),
+    cors_credentials=True,
+    acl=acl_authenticated
+)
+
+service_document_bulk_get = cornice.Service(
+    name='documents_bulk_get',
+    path='/documents/_bulk_get',
+    description='TractDB Documents Bulk Read',
+    cors_origins=('*',),
+    cors_credentials=True,
+    acl=acl_authenticated
+)
+
 
 def _get_admin(request):
-    # Create our admin object
-    admin = tractdb.server.documents.DocumentsAdmin(
-        couchdb_url=request.registry.settings['tractdb_couchdb'],
-        couchdb_user=request.session['temp_couchdb_user'],
-        couchdb_user_password=request.session['temp_couchdb_user_password']
-    )
+    # Our admin object, shared by the rest of this request
+    return request.tractdb_documents_admin
+
+
+def _get_fields(request):
+    # The fields requested in a comma-separated 'fields' parameter, if any
+    fields = request.params.get('fields', None)
+    if fields is None:
+        return None
+
+    return set(field.strip() for field in fields.split(',') if field.strip())
+
+
+# An If-Match of '*', which matches whatever the current revision is
+_IF_MATCH_ANY = '*'
 
-    return admin
+
+def _get_if_match_rev(request):
+    # The revision given in an If-Match header, if any, or _IF_MATCH_ANY.
+    # Raises ValueError if the header is not a single strong entity tag.
+    if 'If-Match' not in request.headers:
+        return None
+
+    if_match = request.if_match
+    if if_match is webob.etag.AnyETag:
+        return _IF_MATCH_ANY
+
+    # A weak tag cannot name a revision, and we write only one revision
+    if_match_weak = webob.etag.ETagMatcher.parse(request.headers['If-Match'], strong=False)
+    if len(if_match.etags) != 1 or len(if_match_weak.etags) != 1:
+        raise ValueError('If-Match must be a single strong entity tag.')
+
+    return if_match.etags[0]
+
+
+def _is_valid_bulk_document(document):
+    # Whether CouchDB would accept a document in a bulk write, so one document cannot fail the rest
+    if not isinstance(document, dict):
+        return False
+
+    doc_id = document.get('_id', None)
+    if doc_id is not None and not isinstance(doc_id, str):
+        return False
+    if doc_id is not None and (not doc_id or doc_id.startswith('_') and not doc_id.startswith('_design/')):
+        return False
+
+    doc_rev = document.get('_rev', None)
+    if doc_rev is not None and not isinstance(doc_rev, str):
+        return False
+
+    return True
+
+
+def _is_bad_request(error):
+    # Whether CouchDB rejected a request as malformed, such as for an invalid revision
+    return isinstance(error.args[0], tuple) and error.args[0][0] == 400
 
 
 @service_document.delete(permission='authenticated')
 def delete(request):
     """ Delete a document.
+
+    The revision to delete may be given in an If-Match header or a 'rev' parameter,
+    otherwise the current revision is deleted. An If-Match of '*' requires that the
+    document exists.
     """
     # Our account parameter
     doc_id = request.matchdict['id_document']
 
+    # Our revision, if provided
+    try:
+        doc_rev = _get_if_match_rev(request)
+    except ValueError:
+        request.response.status_int = 412
+        return
+
+    if doc_rev is None:
+        doc_rev = request.params.get('rev', None)
+
     # Our admin object
     admin = _get_admin(request)
 
-    # Be sure it exists
-    if not admin.exists_document(doc_id):
+    # Any current revision, but the document must exist
+    if doc_rev == _IF_MATCH_ANY:
+        doc_rev = admin.get_document_revision(doc_id)
+        if doc_rev is None:
+            request.response.status_int = 412
+            return
+
+    # Delete it
+    try:
+        admin.delete_document(doc_id, doc_rev=doc_rev)
+    except couchdb.http.ResourceNotFound:
         request.response.status_int = 404
         return
+    except couchdb.http.ResourceConflict:
+        request.response.status_int = 409
+        return
+    except couchdb.http.ServerError as e:
+        if not _is_bad_request(e):
+            raise
 
-    # Delete it
-    admin.delete_document(doc_id)
+        request.response.status_int = 400
+        return
 
     # Return appropriately
     request.response.status_int = 200
@@ -66,6 +164,11 @@ def delete(request):
 @service_document.get(permission='authenticated')
 def get(request):
     """ Get a document.
+
+    The document revision is its ETag. A request with an If-None-Match header that
+    matches the current revision receives a 304 without a body. Accepts an optional
+    comma-separated 'fields' parameter to return only those fields, plus '_id' and
+    '_rev'.
     """
     # Our doc_id
     doc_id = request.matchdict['id_document']
@@ -73,16 +176,28 @@ def get(request):
     # Our admin object
     admin = _get_admin(request)
 
-    # Be sure it exists
-    if not admin.exists_document(doc_id):
-        request.response.status_int = 404
-        return
+    # A conditional request first checks the revision, which does not transfer the body
+    if 'If-None-Match' in request.headers:
+        doc_rev = admin.get_document_revision(doc_id)
+        if doc_rev is None:
+            request.response.status_int = 404
+            return
+
+        if doc_rev in request.if_none_match:
+            request.response.status_int = 304
+            request.response.etag = doc_rev
+
+            return request.response
 
     # Get the document
-    doc = admin.get_document(doc_id)
+    doc = admin.get_document_if_exists(doc_id, fields=_get_fields(request))
+    if doc is None:
+        request.response.status_int = 404
+        return
 
     # Return appropriately
     request.response.status_int = 200
+    request.response.etag = doc['_rev']
 
     return doc
 
@@ -129,43 +244,64 @@ def post(request):
 @service_document.put(permission='authenticated')
 def put(request):
     """ Create a document, or modify an existing document.
+
+    Modifying requires the current revision, either as the '_rev' of the document or
+    in an If-Match header. An If-Match of '*' modifies the current revision, which
+    requires that the document exists. A document without a revision is created.
     """
     # Our doc_id
     doc_id = request.matchdict['id_document']
 
-    # TODO: ensure consistent
-
     # Our JSON parameter
     json = request.json_body
     document = json
 
-    # Our admin object
-    admin = _get_admin(request)
-
-    # Create the document with that ID
+    # Our revision, which must be consistent if provided twice
+    doc_rev = document.get('_rev', None)
     try:
-        if not admin.exists_document(doc_id):
-            result = admin.create_document(
-                document,
-                doc_id=doc_id
-            )
+        if_match_rev = _get_if_match_rev(request)
+    except ValueError:
+        request.response.status_int = 412
+        return
 
-            result_status = 201
-        else:
-            if not '_rev' in document:
-                request.response.status_int = 409
-                return
+    if if_match_rev is not None and if_match_rev != _IF_MATCH_ANY:
+        if doc_rev is not None and doc_rev != if_match_rev:
+            request.response.status_int = 400
+            return
 
-            result = admin.update_document(
-                document,
-                doc_id=doc_id
-            )
+        doc_rev = if_match_rev
 
-            result_status = 200
+    # Our admin object
+    admin = _get_admin(request)
 
+    # Any current revision, but the document must exist
+    if if_match_rev == _IF_MATCH_ANY and doc_rev is None:
+        doc_rev = admin.get_document_revision(doc_id)
+        if doc_rev is None:
+            request.response.status_int = 412
+            return
+
+    # Create or modify the document with that ID, in a single write
+    try:
+        result = admin.put_document(
+            document,
+            doc_id=doc_id,
+            doc_rev=doc_rev
+        )
+    except couchdb.http.ResourceNotFound:
+        request.response.status_int = 404
+        return
     except couchdb.http.ResourceConflict:
         request.response.status_int = 409
         return
+    except couchdb.http.ServerError as e:
+        if not _is_bad_request(e):
+            raise
+
+        request.response.status_int = 400
+        return
+
+    result_status = 201 if doc_rev is None else 200
 
     # Get our id and our rev
     doc_id = result['id']
@@ -183,21 +319,68 @@ def put(request):
 @service_document_collection.get(permission='authenticated')
 def collection_get(request):
     """ Get a list of documents.
+
+    Accepts optional 'limit' and 'startkey' parameters to page through documents in id
+    order. A paged response includes 'next', the startkey of the following page or
+    None on the last page. Without a limit, 'stream=true' sends each document as it
+    is read. Accepts an optional 'prefix' parameter to return only documents whose id
+    starts with it. Accepts an optional comma-separated 'fields' parameter to return only
+    those fields of each document, plus '_id' and '_rev'.
     """
+    # Our paging parameters, a page starts at the document with id startkey
+    startkey = request.params.get('startkey', None)
+    limit = request.params.get('limit', None)
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            request.response.status_int = 400
+            return
+
+        if limit < 1:
+            request.response.status_int = 400
+            return
+
+    # Our id prefix and projection parameters
+    prefix = request.params.get('prefix', None)
+    fields = _get_fields(request)
+
     # Our admin object
     admin = _get_admin(request)
 
-    # Get the document ids
-    docs = admin.list_documents()
+    # Without a limit, we can stream all the documents
+    if limit is None and pyramid.settings.asbool(request.params.get('stream', False)):
+        return tractdb_pyramid.streaming.json_collection_response(
+            'documents',
+            admin.iter_documents(startkey=startkey, prefix=prefix, fields=fields)
+        )
 
-    # Get the actual documents
-    docs = [admin.get_document(doc_id) for doc_id in docs]
+    # Without a limit, get all the documents in a single request
+    if limit is None:
+        docs = admin.get_documents(startkey=startkey, prefix=prefix, fields=fields)
+
+        # Return appropriately
+        request.response.status_int = 200
+        return {
+            'documents':
+                docs
+        }
+
+    # Get one more document than we return, it is where the next page starts
+    docs = admin.get_documents(startkey=startkey, limit=limit + 1, prefix=prefix, fields=fields)
+    if len(docs) > limit:
+        next_startkey = docs[limit]['_id']
+        docs = docs[:limit]
+    else:
+        next_startkey = None
 
     # Return appropriately
     request.response.status_int = 200
     return {
         'documents':
-            docs
+            docs,
+        'next':
+            next_startkey
     }
 
 
@@ -245,3 +428,89 @@ def collection_post(request):
         '_id': doc_id,
         '_rev': doc_rev
     }
+
+
+@service_document_bulk.post(permission='authenticated')
+def bulk_post(request):
+    """ Create or modify many documents in a single request.
+
+    Each document may include an '_id', and must include its current '_rev' to modify an
+    existing document. The result for each document is either its '_id' and new '_rev'
+    or its '_id' and an 'error' such as 'conflict'.
+    """
+
+    # Our JSON parameter
+    json = request.json_body
+    documents = json.get('documents', None) if isinstance(json, dict) else None
+    if not isinstance(documents, list) or not all(_is_valid_bulk_document(document) for document in documents):
+        request.response.status_int = 400
+        return
+
+    # Our admin object
+    admin = _get_admin(request)
+
+    # Store the documents together
+    try:
+        results = admin.update_documents(documents) if documents else []
+    except couchdb.http.ServerError as e:
+        if not _is_bad_request(e):
+            raise
+
+        request.response.status_int = 400
+        return
+
+    # Report on each document
+    results = [
+        {
+            '_id': result['id'],
+            '_rev': result['rev']
+        } if 'error' not in result else {
+            '_id': result.get('id', None),
+            'error': result['error'],
+            'reason': result.get('reason', None)
+        }
+        for result in results
+    ]
+
+    # Return appropriately
+    request.response.status_int = 200
+
+    return {
+        'documents':
+            results
+    }
+
+
+@service_document_bulk_get.post(permission='authenticated')
+def bulk_get_post(request):
+    """ Get many documents by id in a single request.
+
+    Returns the 'documents' that were found, in the order requested, and the ids that
+    are 'missing'.
+    """
+
+    # Our JSON parameter
+    json = request.json_body
+    doc_ids = json.get('ids', None) if isinstance(json, dict) else None
+    if not isinstance(doc_ids, list) or not all(isinstance(doc_id, str) for doc_id in doc_ids):
+        request.response.status_int = 400
+        return
+
+    # Each id only once, in the order requested
+    doc_ids = list(collections.OrderedDict.fromkeys(doc_ids))
+
+    # Our admin object
+    admin = _get_admin(request)
+
+    # Get the documents together
+    docs = admin.get_documents_by_id(doc_ids) if doc_ids else {}
+
+    # Return appropriately
+    request.response.status_int = 200
+
+    return {
+        'documents':
+            [docs[doc_id] for doc_id in doc_ids if doc_id in docs],
+        'missing':
+            [doc_id for doc_id in doc_ids if doc_id not in docs]
+    }
@@ -3,7 +3,6 @@ import cornice
 import datetime
 import pyramid.security
 import requests
-import tractdb.server.documents
 
 
 def acl_authenticated(request):
@@ -60,14 +59,8 @@ service_single_weekly = cornice.Service(
 
 
 def _get_admin(request):
-    # Create our admin object
-    admin = tractdb.server.documents.DocumentsAdmin(
-        couchdb_url=request.registry.settings['tractdb_couchdb'],
-        couchdb_user=request.session['temp_couchdb_user'],
-        couchdb_user_password=request.session['temp_couchdb_user_password']
-    )
-
-    return admin
+    # Our admin object, shared by the rest of this request
+    return request.tractdb_documents_admin
 
 
 def _prepare_content_empty_day_sleep(*, docs, pid, date):
@@ -274,14 +267,17 @@ def service_family_daily_get(request):
     # Gather the documents it will need
     docs = {}
     docs['familysleep_personas'] = admin.get_document(doc_id='familysleep_personas')
+
+    doc_ids_fitbit_sleep = []
     for current_pid in docs['familysleep_personas']['personas'].keys():
         doc_id_fitbit_sleep = 'fitbit-{}-sleep-{}'.format(
             docs['familysleep_personas']['personas'][current_pid]['fitbit'],
             date
         )
+        doc_ids_fitbit_sleep.append(doc_id_fitbit_sleep)
 
-        if admin.exists_document(doc_id=doc_id_fitbit_sleep):
-            docs[doc_id_fitbit_sleep] = admin.get_document(doc_id_fitbit_sleep)
+    # Read all the sleep documents that exist in a single request
+    docs.update(admin.get_documents_by_id(doc_ids_fitbit_sleep))
 
     # Compute the summary
     doc_result = _compute_family_daily(docs=docs, date=date)
@@ -306,6 +302,7 @@ def service_family_weekly_get(request):
     docs = {}
     docs['familysleep_personas'] = admin.get_document(doc_id='familysleep_personas')
 
+    doc_ids_fitbit_sleep = []
     for current_pid in docs['familysleep_personas']['personas'].keys():
         for days_back in reversed(range(0, 7)):
             current_date = datetime.datetime.strptime(date, '%Y-%m-%d') - datetime.timedelta(days=days_back)
@@ -315,8 +312,10 @@ def service_family_weekly_get(request):
                 docs['familysleep_personas']['personas'][current_pid]['fitbit'],
                 current_date
             )
-            if admin.exists_document(doc_id=doc_id_fitbit_sleep):
-                docs[doc_id_fitbit_sleep] = admin.get_document(doc_id_fitbit_sleep)
+            doc_ids_fitbit_sleep.append(doc_id_fitbit_sleep)
+
+    # Read all the sleep documents that exist in a single request
+    docs.update(admin.get_documents_by_id(doc_ids_fitbit_sleep))
 
     # Compute the summary
     doc_result = _compute_family_weekly(docs=docs, date=date)
@@ -346,8 +345,11 @@ def service_single_daily_get(request):
         docs['familysleep_personas']['personas'][pid]['fitbit'],
         date
     )
-    if admin.exists_document(doc_id=doc_id_fitbit_sleep):
-        docs[doc_id_fitbit_sleep] = admin.get_document(doc_id_fitbit_sleep)
+
+    # Read the sleep document if it exists, in a single request
+    doc_fitbit_sleep = admin.get_document_if_exists(doc_id_fitbit_sleep)
+    if doc_fitbit_sleep is not None:
+        docs[doc_id_fitbit_sleep] = doc_fitbit_sleep
 
     # Compute the summary
     doc_result = _compute_single_daily(docs=docs, pid=pid, date=date, with_chart_data=True)
@@ -373,6 +375,7 @@ def service_single_weekly_get(request):
     docs = {}
     docs['familysleep_personas'] = admin.get_document(doc_id='familysleep_personas')
 
+    doc_ids_fitbit_sleep = []
     for days_back in reversed(range(0, 7)):
         current_date = datetime.datetime.strptime(date, '%Y-%m-%d') - datetime.timedelta(days=days_back)
         current_date = current_date.strftime('%Y-%m-%d')
@@ -381,8 +384,10 @@ def service_single_weekly_get(request):
             docs['familysleep_personas']['personas'][pid]['fitbit'],
             current_date
         )
-        if admin.exists_document(doc_id=doc_id_fitbit_sleep):
-            docs[doc_id_fitbit_sleep] = admin.get_document(doc_id_fitbit_sleep)
+        doc_ids_fitbit_sleep.append(doc_id_fitbit_sleep)
+
+    # Read all the sleep documents that exist in a single request
+    docs.update(admin.get_documents_by_id(doc_ids_fitbit_sleep))
 
     # Compute the summary
     doc_result = _compute_single_weekly(docs=docs, pid=pid, date=date, with_chart_data=True)
@@ -12,11 +12,34 @@ service = cornice.Service(
 
 @service.get()
 def get(request):
-    return {
-        'status':
-            'ready',
-        'couchdb':
-            requests.get(
-                request.registry.settings['tractdb_couchdb']
-            ).json()
-    }
+    connections = request.registry.tractdb_couchdb_connections
+
+    # Report whether CouchDB responds in time
+    try:
+        result = {
+            'status':
+                'ready',
+            'couchdb':
+                requests.get(
+                    request.registry.settings['tractdb_couchdb'],
+                    timeout=connections.timeout
+                ).json()
+        }
+    except (requests.RequestException, ValueError):
+        request.response.status_int = 503
+        result = {
+            'status':
+                'unavailable',
+            'couchdb':
+                None
+        }
+
+    # Report on our CouchDB connections
+    result['couchdb_connections'] = connections.stats()
+
+    # Report on our document cache, if enabled
+    document_cache = request.registry.tractdb_document_cache
+    if document_cache is not None:
+        result['document_cache'] = document_cache.stats()
+
+    return result
@@ -2,7 +2,8 @@
 """
 
 import cornice
-import tractdb.server.documents
+import pyramid.settings
+import tractdb_pyramid.streaming
 
 service_allchapters = cornice.Service(
     name='storytelling_allchapters',
@@ -14,28 +15,29 @@ service_allchapters = cornice.Service(
 
 
 def _get_admin(request):
-    # Create our admin object
-    admin = tractdb.server.documents.DocumentsAdmin(
-        couchdb_url=request.registry.settings['tractdb_couchdb'],
-        couchdb_user=request.session['temp_couchdb_user'],
-        couchdb_user_password=request.session['temp_couchdb_user_password']
-    )
-
-    return admin
+    # Our admin object, shared by the rest of this request
+    return request.tractdb_documents_admin
 
 
 @service_allchapters.get()
 def get_chapters(request):
     """ Get all chapters associated with an account.
+
+    Accepts an optional 'stream=true' parameter to send each chapter as it is read.
     """
 
     # Our admin object
     admin = _get_admin(request)
 
+    # Stream the documents if requested
+    if pyramid.settings.asbool(request.params.get('stream', False)):
+        return tractdb_pyramid.streaming.json_collection_response(
+            'chapters',
+            admin.iter_documents(prefix='chapter_')
+        )
+
     # Get all chapters associated with the user
-    all_chapter_docs = [
-        admin.get_document(a) for a in admin.list_documents() if a.startswith('chapter_')
-    ]
+    all_chapter_docs = admin.get_documents(prefix='chapter_')
 
     # Return appropriately
     request.response.status_int = 200
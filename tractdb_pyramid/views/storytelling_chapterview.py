@@ -2,7 +2,6 @@
 """
 
 import cornice
-import tractdb.server.documents
 
 service_chapters = cornice.Service(
     name='storytelling_chapters',
@@ -14,14 +13,8 @@ service_chapters = cornice.Service(
 
 
 def _get_admin(request):
-    # Create our admin object
-    admin = tractdb.server.documents.DocumentsAdmin(
-        couchdb_url=request.registry.settings['tractdb_couchdb'],
-        couchdb_user=request.session['temp_couchdb_user'],
-        couchdb_user_password=request.session['temp_couchdb_user_password']
-    )
-
-    return admin
+    # Our admin object, shared by the rest of this request
+    return request.tractdb_documents_admin
 
 
 @service_chapters.get()
@@ -41,9 +34,7 @@ def get_chapters(request):
         return
 
     # Get all chapters associated with the user
-    all_chapter_docs = [
-        admin.get_document(a) for a in admin.list_documents() if a.startswith('chapter_')
-    ]
+    all_chapter_docs = admin.get_documents(prefix='chapter_')
 
     # Filter to chapters associated with the story
     story_chapter_docs = [
@@ -2,7 +2,8 @@
 """
 
 import cornice
-import tractdb.server.documents
+import pyramid.settings
+import tractdb_pyramid.streaming
 
 service_stories = cornice.Service(
     name='storytelling_stories',
@@ -14,28 +15,29 @@ service_stories = cornice.Service(
 
 
 def _get_admin(request):
-    # Create our admin object
-    admin = tractdb.server.documents.DocumentsAdmin(
-        couchdb_url=request.registry.settings['tractdb_couchdb'],
-        couchdb_user=request.session['temp_couchdb_user'],
-        couchdb_user_password=request.session['temp_couchdb_user_password']
-    )
-
-    return admin
+    # Our admin object, shared by the rest of this request
+    return request.tractdb_documents_admin
 
 
 @service_stories.get()
 def get_stories(request):
     """ Get all stories associated with an account.
+
+    Accepts an optional 'stream=true' parameter to send each story as it is read.
     """
 
     # Our admin object
     admin = _get_admin(request)
 
+    # Stream the documents if requested
+    if pyramid.settings.asbool(request.params.get('stream', False)):
+        return tractdb_pyramid.streaming.json_collection_response(
+            'stories',
+            admin.iter_documents(prefix='story_')
+        )
+
     # Get all stories associated with the user
-    all_story_docs = [
-        admin.get_document(a) for a in admin.list_documents() if a.startswith('story_')
-    ]
+    all_story_docs = admin.get_documents(prefix='story_')
 
     # Return appropriately
     request.response.status_int = 200
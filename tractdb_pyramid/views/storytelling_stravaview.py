@@ -2,7 +2,6 @@
 """
 
 import cornice
-import tractdb.server.documents
 from stravalib.client import Client as StravaClient
 from stravalib import unithelper
 from forecastiopy import *
@@ -34,14 +33,8 @@ service_access_token = cornice.Service(
 
 
 def _get_admin(request):
-    # Create our admin object
-    admin = tractdb.server.documents.DocumentsAdmin(
-        couchdb_url=request.registry.settings['tractdb_couchdb'],
-        couchdb_user=request.session['temp_couchdb_user'],
-        couchdb_user_password=request.session['temp_couchdb_user_password']
-    )
-
-    return admin
+    # Our admin object, shared by the rest of this request
+    return request.tractdb_documents_admin
 
 @service_access_token.put()
 def set_access_token(request):
@@ -125,7 +118,7 @@ def get_runs(request, n):
     access_token = admin.get_document('strava_access_token')
 
     running_docs = {
-        a:admin.get_document(a) for a in admin.list_documents() if a.startswith('run_')
+        doc['_id']: doc for doc in admin.get_documents(prefix='run_')
     }
 
     strava_client = StravaClient(access_token=access_token['strava_access_token'])